@@ -1,23 +1,14 @@
 import streamlit as st
-from neo4j import GraphDatabase
 import pandas as pd
-import .labdataranger as ldr
+from labdataranger.graph.driver import get_driver
+from labdataranger.graph.query import run_query, cypher_name
 
-db_config = ldr.query.get_db_config()
-uri = f"{db_config['uri']}:{db_config['port']}"
-username = db_config['username']
-password = db_config['password']
 database = "instruments"
 
 
 def fetch_properties_by_label(label):
-    query = f"MATCH (n:{label}) RETURN properties(n) AS properties"
-    driver = GraphDatabase.driver(uri, auth=(user, password))
-    with driver.session(database=database) as session:
-        result = session.run(query)
-        data = [record["properties"] for record in result]
-    driver.close()
-    return pd.DataFrame(data)
+    properties = run_query('properties_by_label', labels={'label': label}, database=database)
+    return pd.DataFrame(properties['properties'].tolist())
 
 def summarize_property_analysis(df):
     summary_data = []
@@ -99,19 +90,17 @@ def generate_cypher_query(label, filters):
     for i, f in enumerate(filters):
         if f['property'] and f['values']:
             param_name = f"values{i}"
-            where_clauses.append(f"n.{f['property']} IN ${param_name}")
+            where_clauses.append(f"n.{cypher_name(f['property'])} IN ${param_name}")
             parameters[param_name] = f['values']
 
-    query = f"MATCH (n:{label})" + (" WHERE " + " AND ".join(where_clauses) if where_clauses else "") + " RETURN n"
+    query = f"MATCH (n:{cypher_name(label)})" + (" WHERE " + " AND ".join(where_clauses) if where_clauses else "") + " RETURN n"
     return query, parameters
     
 
 def execute_cypher_query(query, parameters):
-    driver = GraphDatabase.driver(uri, auth=(user, password))
-    with driver.session(database=database) as session:
+    with get_driver().session(database=database) as session:
         result = session.run(query, parameters)
         data = [record["n"] for record in result]
-    driver.close()
     return pd.DataFrame(data)
 
 
@@ -1,5 +1,5 @@
 import streamlit as st
-from neo4j import GraphDatabase
+from labdataranger.graph.driver import get_driver
 import pandas as pd
 from pyvis.network import Network
 import json
@@ -58,7 +58,8 @@ def manage_queries(recall_query):
 
 # Neo4j Connection
 def get_neo4j_session(uri, user, password, database=None):
-    driver = GraphDatabase.driver(uri, auth=(user, password))
+    # Shared per connection settings, so reruns reuse the connection pool
+    driver = get_driver(config={'uri': uri, 'username': user, 'password': password})
     session = driver.session(database=database) if database else driver.session()
     return session
 
@@ -0,0 +1,118 @@
+"""
+Benchmark DICOM metadata extraction on a synthetic MR series: the previous
+full ``dcmread`` against the header-only read in format.dicom.extract_metadata,
+counting the bytes each one pulls from disk.
+
+    python benchmarks/bench_dicom.py --slices 5000
+"""
+import io
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, MRImageStorage, generate_uid
+from labdataranger.disk.dataset.scan.format.dicom import extract_metadata, _extract_all_metadata
+
+
+class CountingFileIO(io.FileIO):
+    """ FileIO that counts the bytes actually read from the file. """
+
+    bytes_read = 0
+
+    def readinto(self, b):
+        n = super().readinto(b)
+        CountingFileIO.bytes_read += n or 0
+        return n
+
+
+def write_dataset(path, ds):
+    try:
+        pydicom.dcmwrite(path, ds, enforce_file_format=True)
+    except TypeError:
+        # pydicom < 3
+        ds.is_little_endian, ds.is_implicit_VR = True, False
+        pydicom.dcmwrite(path, ds, write_like_original=False)
+
+
+def make_mr_series(root, n_slices, rows=256, columns=256, csa_size=12000):
+    """ Write ``n_slices`` MR slices with a vendor-style private header into ``root``. """
+    series_uid = generate_uid()
+    pixels = np.zeros((rows, columns), dtype=np.uint16).tobytes()
+    for i in range(n_slices):
+        meta = FileMetaDataset()
+        meta.MediaStorageSOPClassUID = MRImageStorage
+        meta.MediaStorageSOPInstanceUID = generate_uid()
+        meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+        ds = Dataset()
+        ds.file_meta = meta
+        ds.SOPClassUID = MRImageStorage
+        ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+        ds.SeriesInstanceUID = series_uid
+        ds.Modality = 'MR'
+        ds.PatientName = 'Synthetic^Mouse'
+        ds.SeriesDescription = 'T2 RARE'
+        ds.InstanceNumber = i + 1
+        ds.SliceLocation = i * 0.1
+        ds.ImagePositionPatient = [0.0, 0.0, i * 0.1]
+        ds.Rows, ds.Columns = rows, columns
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = 'MONOCHROME2'
+        ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 16, 15
+        ds.PixelRepresentation = 0
+        ds.add_new(0x00290010, 'LO', 'SIEMENS CSA HEADER')
+        ds.add_new(0x00291010, 'OB', bytes(csa_size))
+        ds.PixelData = pixels
+        write_dataset(os.path.join(root, f"slice_{i + 1:05d}.dcm"), ds)
+    return root
+
+
+def extract_full(filepath):
+    """ What extract_metadata did before: read everything, then drop the pixels. """
+    return _extract_all_metadata(pydicom.dcmread(filepath))
+
+
+def run(files, extractor):
+    CountingFileIO.bytes_read = 0
+    start = time.perf_counter()
+    for path in files:
+        with io.BufferedReader(CountingFileIO(path)) as f:
+            extractor(f)
+    return CountingFileIO.bytes_read, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark header-only DICOM metadata extraction.")
+    parser.add_argument("--slices", type=int, default=5000, help="Number of synthetic slices (default: 5000).")
+    parser.add_argument("--rows", type=int, default=256, help="Rows and columns per slice (default: 256).")
+    parser.add_argument("--root", type=str, help="Existing or new directory for the synthetic series (default: temp dir).")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic series after the run.")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="ldr_bench_dicom_")
+    try:
+        if not os.listdir(root):
+            start = time.perf_counter()
+            make_mr_series(root, args.slices, args.rows, args.rows)
+            print(f"Created {args.slices} slices in {time.perf_counter() - start:.1f} s under {root}")
+        files = sorted(os.path.join(root, _f) for _f in os.listdir(root) if _f.endswith('.dcm'))
+        n = len(files)
+
+        for label, extractor in (
+                ("full read", extract_full),
+                ("header only", extract_metadata),
+                ("tag allowlist", lambda f: extract_metadata(f, specific_tags=['InstanceNumber', 'SliceLocation']))):
+            bytes_read, elapsed = run(files, extractor)
+            print(f"{label:>13}: {bytes_read / n / 1024:8.1f} KiB/slice {elapsed / n * 1e3:8.3f} ms/slice "
+                  f"({elapsed:.2f} s total)")
+    finally:
+        if not args.keep and not args.root:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
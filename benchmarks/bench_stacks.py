@@ -0,0 +1,69 @@
+"""
+Benchmark format.find_file_stacks against the previous listdir + re-matching
+sort on a synthetic projection folder.
+
+    python benchmarks/bench_stacks.py --files 10000
+"""
+import os
+import re
+import time
+import shutil
+import argparse
+import tempfile
+from collections import defaultdict
+from labdataranger.disk.dataset.scan.format import find_file_stacks
+
+
+def find_file_stacks_legacy(directory, extension):
+    """ What find_file_stacks did before: listdir, then re-match every name in the sort key. """
+    regex = re.compile(rf"^(?P<stem>.+?)(?P<number>\d+)\.{extension}$")
+    stacks = defaultdict(list)
+    for filename in os.listdir(directory):
+        match = regex.match(filename)
+        if match:
+            stacks[match.group("stem")].append(os.path.join(directory, filename))
+    for stem in stacks:
+        stacks[stem] = sorted(stacks[stem], key=lambda x: int(regex.match(os.path.basename(x)).group("number")))
+    return stacks
+
+
+def time_call(func, *args, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark find_file_stacks.")
+    parser.add_argument("--files", type=int, default=10000, help="Number of synthetic slices (default: 10000).")
+    parser.add_argument("--root", type=str, help="Existing or new directory for the synthetic slices (default: temp dir).")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic slices after the run.")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="ldr_bench_stacks_")
+    try:
+        if not os.listdir(root):
+            for i in range(args.files):
+                open(os.path.join(root, f"scan_{i:08d}.tif"), 'wb').close()
+            print(f"Created {args.files} files under {root}")
+
+        legacy, legacy_time = time_call(find_file_stacks_legacy, root, "tif")
+        stacks, stacks_time = time_call(find_file_stacks, root, "tif")
+
+        print(f"legacy: {legacy_time * 1e3:8.1f} ms")
+        print(f"  scan: {stacks_time * 1e3:8.1f} ms ({legacy_time / stacks_time:.1f}x)")
+        print(f"  identical stacks: {dict(legacy) == dict(stacks)}")
+        for stem, summary in stacks.summaries.items():
+            print(f"  {stem}: {summary['count']} files, {summary['min_index']}..{summary['max_index']}, "
+                  f"{summary['missing_count']} missing, {len(summary['duplicates'])} duplicated")
+    finally:
+        if not args.keep and not args.root:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
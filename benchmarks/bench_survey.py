@@ -0,0 +1,128 @@
+"""
+Benchmark FileTree.collect_file_tree (os.scandir walker) against the previous
+Path.rglob walker on a synthetic file tree.
+
+    python benchmarks/bench_survey.py --files 1000000
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from labdataranger.disk.filetree.survey import FileTree
+
+
+def make_synthetic_tree(root, n_files, files_per_dir=1000, dirs_per_project=10, ext='.raw'):
+    """ Create ``n_files`` empty files laid out as project/scan/slice folders. """
+    n_dirs = max(1, -(-n_files // files_per_dir))
+    created = 0
+    for d in range(n_dirs):
+        scan_dir = os.path.join(root, f"project_{d // dirs_per_project:04d}", f"scan_{d:06d}")
+        os.makedirs(scan_dir, exist_ok=True)
+        for i in range(min(files_per_dir, n_files - created)):
+            open(os.path.join(scan_dir, f"slice_{i:07d}{ext}"), 'wb').close()
+        created += files_per_dir
+    return root
+
+
+def collect_file_tree_rglob(ft):
+    """ The Path.rglob walker FileTree.collect_file_tree used before os.scandir. """
+    def add_to_tree(path, tree):
+        parts = path.relative_to(ft.base_directory).parts
+        current_tree = tree
+        for part in parts[:-1]:
+            if part not in current_tree:
+                current_tree[part] = {'type': 'folder', 'size': 0, 'created': None, 'modified': None,
+                                      'contents': {}}
+            current_tree = current_tree[part]['contents']
+        if path.is_dir():
+            stats = path.stat()
+            current_tree[parts[-1]] = {
+                'type': 'folder',
+                'size': 0,
+                'created': time.ctime(stats.st_ctime),
+                'modified': time.ctime(stats.st_mtime),
+                'contents': {}
+            }
+        elif path.is_file():
+            stats = path.stat()
+            meta_data = {}
+            if path.suffix in ft.file_types:
+                meta_data = ft.parse_metadata_file(path)
+            current_tree[parts[-1]] = {
+                'type': f'{path.suffix}',
+                'size': stats.st_size,
+                'created': time.ctime(stats.st_ctime),
+                'modified': time.ctime(stats.st_mtime),
+                'contents': None,
+                'metadata': meta_data
+            }
+            current_tree = tree
+            for part in parts[:-1]:
+                current_tree = current_tree[part]['contents']
+                current_tree['size'] = current_tree.get('size', 0) + stats.st_size
+
+    file_tree = {
+        'base': {
+            'type': 'folder',
+            'size': 0,
+            'created': time.ctime(ft.base_directory.stat().st_ctime),
+            'modified': time.ctime(ft.base_directory.stat().st_mtime),
+            'contents': {}
+        }
+    }
+    for item in ft.base_directory.rglob('*'):
+        if not any(skip in str(item) for skip in ft.skips):
+            add_to_tree(item, file_tree['base']['contents'])
+            if item.is_dir():
+                ft.log_message(f"Processing directory: {item}")
+            elif item.is_file():
+                ft.log_message(f"Processing file: {item}")
+    return file_tree
+
+
+def tree_entries(contents, path=''):
+    """ (path, type, size) of every file and folder, for comparing walker output. """
+    entries = set()
+    for name, node in contents.items():
+        if isinstance(node, dict):
+            entries.add((f"{path}/{name}", node['type'], node['size'] if node['type'] != 'folder' else 0))
+            if node['type'] == 'folder':
+                entries |= tree_entries(node['contents'], f"{path}/{name}")
+    return entries
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the FileTree directory walkers.")
+    parser.add_argument("--files", type=int, default=1000000, help="Number of synthetic files (default: 1000000).")
+    parser.add_argument("--files-per-dir", type=int, default=1000, help="Files per scan folder (default: 1000).")
+    parser.add_argument("--root", type=str, help="Existing or new directory for the synthetic tree (default: temp dir).")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic tree after the run.")
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="ldr_bench_")
+    try:
+        if not os.listdir(root):
+            _, elapsed = time_call(make_synthetic_tree, root, args.files, args.files_per_dir)
+            print(f"Created {args.files} files in {elapsed:.1f} s under {root}")
+
+        ft = FileTree(root)
+        legacy_tree, legacy_time = time_call(collect_file_tree_rglob, ft)
+        scandir_tree, scandir_time = time_call(ft.collect_file_tree)
+
+        print(f"  rglob walker: {legacy_time:8.2f} s")
+        print(f"scandir walker: {scandir_time:8.2f} s ({legacy_time / scandir_time:.1f}x)")
+        print(f"  identical entries: {tree_entries(legacy_tree['base']['contents']) == tree_entries(scandir_tree['base']['contents'])}")
+    finally:
+        if not args.keep and not args.root:
+            shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
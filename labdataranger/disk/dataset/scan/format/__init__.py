@@ -1,10 +1,13 @@
 import os
 import re
-from collections import defaultdict
+import time
+import concurrent.futures
+from collections import defaultdict, deque
 from tqdm import tqdm
-from .dicom import extract_metadata as extract_dicom
-from .tiff import extract_metadata as extract_tiff
+from .dicom import extract_metadata as extract_dicom, key_tag_values as dicom_key_tags
+from .tiff import extract_metadata as extract_tiff, key_tag_values as tiff_key_tags
 from .bruker_log import extract_metadata as extract_bruker_log
+from .series import SeriesMetadata
 # from .json import extract_metadata as extract_json
 # from .nifti import extract_metadata as extract_nifti
 # from .xml import extract_metadata as extract_xml
@@ -19,6 +22,13 @@ EXTRACTION_MAP = {
     # "xml": extract_xml,
 }
 
+# Key tags checked for consistency when a stack is sampled
+KEY_TAG_MAP = {
+    "dcm": dicom_key_tags,
+    "tiff": tiff_key_tags,
+    "tif": tiff_key_tags,
+}
+
 
 def extract_metadata(filepath):
     """
@@ -35,66 +45,328 @@ def extract_metadata(filepath):
         raise ValueError(f"Unsupported file type: {ext}")
 
 
+class FileStacks(dict):
+    """
+    Stack stem -> file paths in numerical order, as returned by find_file_stacks.
+
+    ``indices`` maps each stem to the sorted slice numbers of its files and
+    ``summaries`` to a dict with the file ``count``, ``min_index``,
+    ``max_index``, the ``missing`` numbers between them as inclusive
+    ``(start, end)`` ranges with their total in ``missing_count``, and any ``duplicates``
+    (numbers matched by more than one file, e.g. ``img_7.tif`` and
+    ``img_007.tif``). Both are filled in the same pass that builds the stacks.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.indices = {}
+        self.summaries = {}
+
+
+def _stack_summary(numbers):
+    # Gaps are kept as ranges: UID-named files can be numbered billions apart
+    missing = []
+    missing_count = 0
+    duplicates = []
+    for previous, number in zip(numbers, numbers[1:]):
+        if number == previous:
+            if not duplicates or duplicates[-1] != number:
+                duplicates.append(number)
+        elif number > previous + 1:
+            missing.append((previous + 1, number - 1))
+            missing_count += number - previous - 1
+    return {
+        "count": len(numbers),
+        "min_index": numbers[0],
+        "max_index": numbers[-1],
+        "missing": missing,
+        "missing_count": missing_count,
+        "duplicates": duplicates,
+    }
+
+
 def find_file_stacks(directory, extension, pattern=None):
     """
     Identifies file stacks in a directory based on a common stem and numbering pattern.
 
     Args:
         directory (str): Path to the directory to scan.
-        extension (str): File extension to filter by (e.g., 'tif', 'dcm').
-        pattern (str, optional): Custom regex pattern for identifying stacks.
+        extension (str or list): File extension(s) to filter by (e.g., 'tif', ['tif', 'tiff']).
+        pattern (str, optional): Custom regex pattern for identifying stacks, with
+            ``stem`` and ``number`` groups.
             Default matches `{stem}_???????.{extension}`.
 
     Returns:
-        dict: A dictionary where keys are common stems and values are lists of file paths in the stack.
+        FileStacks: A dictionary where keys are common stems and values are lists of file
+            paths in the stack, with per-stack ``indices`` and ``summaries``.
     """
     if not pattern:
         # Default pattern: matches {stem}_???????.{extension}
-        pattern = rf"^(?P<stem>.+?)(?P<number>\d+)\.{extension}$"
+        extensions = [extension] if isinstance(extension, str) else list(extension)
+        pattern = rf"^(?P<stem>.+?)(?P<number>\d+)\.(?:{'|'.join(extensions)})$"
 
-    regex = re.compile(pattern)
-    stacks = defaultdict(list)
+    match = re.compile(pattern).match
+    numbered = defaultdict(list)
 
-    for filename in os.listdir(directory):
-        match = regex.match(filename)
-        if match:
-            stem = match.group("stem")
-            stacks[stem].append(os.path.join(directory, filename))
+    # One match per entry; scandir reuses the entry type, so no extra stat
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            found = match(entry.name)
+            if found and entry.is_file():
+                numbered[found.group("stem")].append((int(found.group("number")), entry.name, entry.path))
 
-    # Sort file paths in each stack by their numerical order
-    for stem in stacks:
-        stacks[stem] = sorted(stacks[stem], key=lambda x: int(regex.match(os.path.basename(x)).group("number")))
+    # Sort each stack by its (number, name) keys
+    stacks = FileStacks()
+    for stem, files in numbered.items():
+        files.sort()
+        numbers = [_f[0] for _f in files]
+        stacks[stem] = [_f[2] for _f in files]
+        stacks.indices[stem] = numbers
+        stacks.summaries[stem] = _stack_summary(numbers)
 
     return stacks
 
-def process_all_stacks(stacks, metadata_extractor):
-    results = []
-    for stack_key, stack_files in stacks.items(): #tqdm(stacks.items(), desc="Processing all stacks", total=len(stacks.keys())):
-        result = process_stack(stack_key, stack_files, metadata_extractor)
-        results.append(result)
-    return results
+EXECUTORS = {
+    "thread": concurrent.futures.ThreadPoolExecutor,
+    "process": concurrent.futures.ProcessPoolExecutor,
+}
 
-def process_stack(stack_key, stack_files, metadata_extractor):
-    """Process a single stack of files to extract metadata."""
-    stack_metadata = []
-    for file_path in tqdm(stack_files, desc=f"Processing files in {stack_key}", total=len(stack_files)):
+
+def _extract_chunk(metadata_extractor, file_paths):
+    """ Worker entry point: extract a chunk of files, returning (metadata, error) pairs. """
+    results = []
+    for file_path in file_paths:
         try:
-            metadata = metadata_extractor(file_path)  # Your TIFF metadata extractor
-            stack_metadata.append(metadata)
+            results.append((metadata_extractor(file_path), None))
         except Exception as e:
-            print(f"Error processing {file_path}: {e}")
+            results.append((None, str(e)))
+    return results
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def sample_indices(count, samples):
+    """ First, last and ``samples`` evenly spaced indices in between, of a stack of ``count`` files. """
+    if count <= samples + 2:
+        return list(range(count))
+    return sorted({round(_i * (count - 1) / (samples + 1)) for _i in range(samples + 2)})
+
+
+def _key_tag_function(stack_files):
+    ext = os.path.splitext(stack_files[0])[1][1:].lower() if stack_files else ""
+    return KEY_TAG_MAP.get(ext)
+
+
+def _ordered_chunks(pool, metadata_extractor, jobs, window, progress):
+    """
+    Run ``(tag, file_paths)`` jobs and yield ``(tag, results)`` in job order.
+
+    At most ``window`` jobs are queued ahead of the one being yielded, so only
+    a few chunks of results wait in memory however many files there are. A job
+    without file paths is passed through in order with ``None`` results.
+    """
+    pending = deque()
+
+    def collect(tag, file_paths, future):
+        if file_paths is None:
+            return tag, None
+        if future is not None:
+            return tag, future.result()
+        results = _extract_chunk(metadata_extractor, file_paths)
+        progress.update(len(file_paths))
+        return tag, results
+
+    for tag, file_paths in jobs:
+        future = None
+        if pool is not None and file_paths is not None:
+            future = pool.submit(_extract_chunk, metadata_extractor, file_paths)
+            future.add_done_callback(lambda _f, n=len(file_paths): progress.update(n))
+        pending.append((tag, file_paths, future))
+        while len(pending) > window:
+            yield collect(*pending.popleft())
+    while pending:
+        yield collect(*pending.popleft())
+
+
+def process_all_stacks(stacks, metadata_extractor, deduplicate=False,
+                       executor="serial", max_workers=None, chunk_size=None,
+                       sample=None, key_tags=None):
+    """
+    Extract metadata from every file of every stack.
+
+    Files are handed to the workers in chunks of ``chunk_size`` (by default
+    enough for about four chunks per worker per stack, at most 256 files)
+    and results are collected in submission order, so each stack keeps its
+    slice order whatever backend runs it. Only about two chunks per worker
+    are in flight at a time and each chunk is folded into its stack as it
+    comes back, so memory stays bounded for long series. One progress bar
+    covers all stacks, followed by a throughput summary.
+
+    With ``sample`` only the first, last and ``sample`` evenly spaced files
+    of each stack are read. If their key tags (see ``key_tags``) all agree
+    and none failed, the stack result lists just those files and records
+    ``sampled_indices`` and ``file_count``; otherwise (including when a sample
+    has none of the key tags) the rest of the stack is read as well.
+
+    Args:
+        stacks (dict): Stack key -> ordered file paths, as from find_file_stacks.
+        metadata_extractor (callable): Called with each file path. Must be
+            picklable (a module-level function or functools.partial) for
+            the process backend.
+        deduplicate (bool, optional): Store shared tags once per stack (see process_stack).
+        executor (str or Executor, optional): 'serial', 'thread', 'process' or an
+            existing concurrent.futures executor, which is left running.
+        max_workers (int, optional): Workers for a 'thread' or 'process' backend.
+        chunk_size (int, optional): Files per submitted task.
+        sample (int, optional): Number of evenly spaced files to read between the first and last.
+        key_tags (callable, optional): Returns the values that must match across a
+            sampled stack. Defaults to the format's key_tag_values (KEY_TAG_MAP).
+
+    Returns:
+        list: One result dict per stack, in the order of ``stacks``.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if isinstance(executor, concurrent.futures.Executor):
+        pool = executor
+    elif executor == "serial":
+        pool = None
+    elif executor in EXECUTORS:
+        pool = EXECUTORS[executor](max_workers=workers)
+    else:
+        raise ValueError(f"Unknown executor: {executor} (expected one of serial, {', '.join(EXECUTORS)})")
+    window = 0 if pool is None else workers * 2
+
+    stacks = {_k: list(_v) for _k, _v in stacks.items()}
+    plans = {}
+    for stack_key, stack_files in stacks.items():
+        plans[stack_key] = range(len(stack_files))
+        if sample is not None:
+            if key_tags is None and _key_tag_function(stack_files) is None:
+                print(f"No key tags known for {stack_key}; reading every file")
+            else:
+                plans[stack_key] = sample_indices(len(stack_files), sample)
+
+    def jobs(indices_by_stack, end_markers=False):
+        for stack_key, indices in indices_by_stack.items():
+            size = chunk_size or min(256, max(1, -(-len(indices) // (workers * 4))))
+            for chunk in _chunks(indices, size):
+                yield (stack_key, chunk), [stacks[stack_key][_i] for _i in chunk]
+            if end_markers:
+                yield (stack_key, None), None
+
+    total = sum(len(_p) for _p in plans.values())
+    progress = tqdm(total=total, desc=f"Extracting metadata ({executor if isinstance(executor, str) else 'executor'})")
+    start = time.perf_counter()
+    results = []
+    errors = 0
+    try:
+        samples = {_k: {} for _k, _p in plans.items() if len(_p) < len(stacks[_k])}
+        for (stack_key, chunk), chunk_results in _ordered_chunks(
+                pool, metadata_extractor, jobs({_k: plans[_k] for _k in samples}), window, progress):
+            samples[stack_key].update(zip(chunk, chunk_results))
+
+        sampled = set()
+        remaining = {}
+        for stack_key, stack_files in stacks.items():
+            if stack_key not in samples:
+                remaining[stack_key] = plans[stack_key]
+                continue
+            read = samples[stack_key]
+            key_function = key_tags or _key_tag_function(stack_files)
+            values = [key_function(_m) if _e is None else None for _m, _e in read.values()]
+            if any(_v is None or all(_t is None for _t in _v) for _v in values):
+                # A failed read or no key tags at all (e.g. left out by an allowlist) can't be verified
+                print(f"Key tags of {stack_key} could not be read from the samples; reading all {len(stack_files)} files")
+            elif all(_v == values[0] for _v in values):
+                sampled.add(stack_key)
+                remaining[stack_key] = []
+                continue
+            else:
+                print(f"Sampled files of {stack_key} differ; reading all {len(stack_files)} files")
+            remaining[stack_key] = [_i for _i in range(len(stack_files)) if _i not in read]
+            progress.total += len(remaining[stack_key])
+            total += len(remaining[stack_key])
+
+        def add(index, metadata, error):
+            nonlocal errors
+            if error is not None:
+                errors += 1
+                print(f"Error processing {stacks[stack_key][index]}: {error}")
+            elif deduplicate:
+                stack_metadata.add(metadata)
+            else:
+                stack_metadata.append(metadata)
+
+        stack_metadata = SeriesMetadata() if deduplicate else []
+        for (stack_key, chunk), chunk_results in _ordered_chunks(
+                pool, metadata_extractor, jobs(remaining, end_markers=True), window, progress):
+            # Samples already read are merged back in slice order
+            read = samples.get(stack_key, {})
+            if chunk is not None:
+                for index, (metadata, error) in zip(chunk, chunk_results):
+                    for _i in sorted(_i for _i in read if _i < index):
+                        add(_i, *read.pop(_i))
+                    add(index, metadata, error)
+                continue
+            for _i in sorted(read):
+                add(_i, *read.pop(_i))
+            result = _stack_result(stack_key, stack_metadata)
+            if stack_key in sampled:
+                result["sampled_indices"] = plans[stack_key]
+                result["file_count"] = len(stacks[stack_key])
+            results.append(result)
+            stack_metadata = SeriesMetadata() if deduplicate else []
+    finally:
+        progress.close()
+        if pool is not None and pool is not executor:
+            pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    print(f"Processed {total} files in {len(stacks)} stacks in {elapsed:.2f} s "
+          f"({total / elapsed if elapsed else 0:.0f} files/s, {errors} errors)")
+    return results
+
+
+def process_stack(stack_key, stack_files, metadata_extractor, deduplicate=False, **kwargs):
+    """
+    Process a single stack of files to extract metadata.
+
+    With ``deduplicate`` the tags shared by every file are kept once and only
+    the per-file differences are stored (see SeriesMetadata); the result then
+    has a ``series`` entry ({'shared': ..., 'slices': [...]}) instead of
+    ``metadata``. Other keyword arguments (``executor``, ``max_workers``,
+    ``chunk_size``, ``sample``, ``key_tags``) are passed on to process_all_stacks.
+    """
+    return process_all_stacks({stack_key: stack_files}, metadata_extractor, deduplicate=deduplicate, **kwargs)[0]
+
+
+def _stack_result(stack_key, stack_metadata):
+    if isinstance(stack_metadata, SeriesMetadata):
+        return {
+            "stack_key": stack_key,
+            "series": stack_metadata.to_dict()
+        }
     return {
         "stack_key": stack_key,
         "metadata": stack_metadata
     }
 
+def stack_metadata(stack):
+    """ Full per-file metadata dicts of a processed stack, deduplicated or not. """
+    if "series" in stack:
+        return list(SeriesMetadata.from_dict(stack["series"]))
+    return stack["metadata"]
+
 import pandas as pd
 
 def combine_metadata_to_dataframe(processed_stacks):
     all_metadata = []
     for stack in processed_stacks:
         stack_key = stack["stack_key"]
-        for metadata in stack["metadata"]:
+        for metadata in stack_metadata(stack):
             metadata["stack_key"] = stack_key  # Add group info to each metadata record
             all_metadata.append(metadata)
     return pd.DataFrame(all_metadata)
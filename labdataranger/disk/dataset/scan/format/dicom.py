@@ -1,4 +1,8 @@
 import pydicom
+from pydicom.dataelem import RawDataElement
+
+# Values larger than this are not read; they are recorded by their size only
+DEFAULT_DEFER_SIZE = 64 * 1024
 
 def _convert_value(value):
     """
@@ -21,6 +25,18 @@ def _convert_value(value):
         return str(value) if not isinstance(value, (str, int, float, bool)) else value
 
 
+def _raw_item(ds, tag):
+    """
+    Returns the element for ``tag`` without reading a deferred value from disk.
+    """
+    try:
+        return ds.get_item(tag, keep_deferred=True)
+    except TypeError:
+        # pydicom < 3 has no keep_deferred and get_item reads deferred values,
+        # so look the element up in the dataset's own dict instead
+        return ds._dict.get(pydicom.tag.Tag(tag))
+
+
 def _extract_all_metadata(ds, metadata=None):
     """
     Recursively extracts all metadata from a DICOM dataset, excluding pixel data.
@@ -28,7 +44,16 @@ def _extract_all_metadata(ds, metadata=None):
     if metadata is None:
         metadata = {}
 
-    for elem in ds:
+    for tag in ds.keys():
+        raw = _raw_item(ds, tag)
+        if isinstance(raw, RawDataElement) and raw.value is None and raw.length:
+            # Deferred by dcmread(defer_size=...); reading it would load it from disk
+            keyword = pydicom.datadict.keyword_for_tag(tag)
+            if keyword != "PixelData":
+                metadata[keyword or tag] = f"<{raw.length} bytes not read>"
+            continue
+
+        elem = ds[tag]
         if elem.keyword == "PixelData":
             continue  # Skip pixel data
 
@@ -40,13 +65,36 @@ def _extract_all_metadata(ds, metadata=None):
     return metadata
 
 
-def extract_metadata(filepath):
+def extract_metadata(filepath, specific_tags=None, defer_size=DEFAULT_DEFER_SIZE):
     """
-    Extracts all metadata from a DICOM file.
+    Extracts all metadata from a DICOM file, reading the header only.
+    Reading stops before the pixel data, and other values longer than
+    ``defer_size`` bytes are recorded by size instead of being read.
     Args:
-        filepath (str): Path to the DICOM file.
+        filepath (str): Path to the DICOM file (or an open binary file).
+        specific_tags (list, optional): Keywords or tags to read; all others are skipped.
+        defer_size (int, optional): Size above which values are not read; None reads everything.
     Returns:
         dict: Metadata extracted from the DICOM file.
     """
-    ds = pydicom.dcmread(filepath)
+    ds = pydicom.dcmread(
+        filepath,
+        stop_before_pixels=True,
+        defer_size=defer_size,
+        specific_tags=specific_tags
+    )
     return _extract_all_metadata(ds)
+
+
+# Tags that must agree across the slices of a stack for sampling to be trusted
+KEY_TAGS = (
+    "Rows", "Columns", "BitsAllocated", "BitsStored", "PixelRepresentation",
+    "SamplesPerPixel", "PhotometricInterpretation",
+)
+
+
+def key_tag_values(metadata):
+    """
+    Returns the values of the KEY_TAGS (image size, bit depth, pixel layout) of one slice.
+    """
+    return tuple(metadata.get(tag) for tag in KEY_TAGS)
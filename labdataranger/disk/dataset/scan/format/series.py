@@ -0,0 +1,61 @@
+_MISSING = object()
+
+
+class SeriesMetadata:
+    """
+    Metadata for a stack of slices, with the tags common to every slice stored once.
+
+    ``shared`` holds the tags present in every slice with the same value and
+    ``deltas`` holds, per slice, only the tags that are not shared (for a
+    DICOM series typically InstanceNumber, SliceLocation, ImagePositionPatient,
+    SOPInstanceUID, ...). Slices are added one at a time, so the full header of
+    only one slice is in memory at once. When a tag stops being shared it is
+    pushed back into the deltas of the slices added before.
+
+    ``series[i]`` rebuilds the full metadata dict of slice ``i``.
+    """
+
+    def __init__(self, slices=None):
+        self.shared = {}
+        self.deltas = []
+        for metadata in slices or ():
+            self.add(metadata)
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def __getitem__(self, index):
+        return {**self.shared, **self.deltas[index]}
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def add(self, metadata):
+        """ Add the metadata dict of the next slice. """
+        if not self.deltas:
+            self.shared = dict(metadata)
+            self.deltas.append({})
+            return
+
+        unshared = [_k for _k, _v in self.shared.items() if metadata.get(_k, _MISSING) != _v]
+        for _k in unshared:
+            value = self.shared.pop(_k)
+            for delta in self.deltas:
+                delta[_k] = value
+        self.deltas.append({_k: _v for _k, _v in metadata.items() if _k not in self.shared})
+
+    def varying_tags(self):
+        """ Tags that differ between slices, in first-seen order. """
+        return list(dict.fromkeys(_k for _d in self.deltas for _k in _d))
+
+    def to_dict(self):
+        """ Plain ``{'shared': ..., 'slices': [...]}`` form for YAML/JSON output. """
+        return {'shared': self.shared, 'slices': self.deltas}
+
+    @classmethod
+    def from_dict(cls, data):
+        series = cls()
+        series.shared = dict(data['shared'])
+        series.deltas = [dict(_d) for _d in data['slices']]
+        return series
@@ -71,3 +71,17 @@ def extract_metadata(filepath):
         raise ValueError(f"Error reading TIFF file {filepath}: {e}")
 
     return metadata
+
+
+# Tags that must agree across the slices of a stack for sampling to be trusted
+KEY_TAGS = (
+    "ImageWidth", "ImageLength", "BitsPerSample", "SamplesPerPixel", "Compression",
+)
+
+
+def key_tag_values(metadata):
+    """
+    Returns the values of the KEY_TAGS (dimensions, bit depth, compression) of one TIFF file.
+    """
+    tags = metadata.get('tiff_tags', {})
+    return tuple(tags.get(tag) for tag in KEY_TAGS)
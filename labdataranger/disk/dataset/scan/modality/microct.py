@@ -41,13 +41,14 @@ def combine_log_and_stack(log_file, processed_stacks, reconstruction_stacks=None
     return combined_metadata
 
 
-def process_reconstruction_subfolder(parent_dir, tiff_extension):
+def process_reconstruction_subfolder(parent_dir, tiff_extension, **kwargs):
     """
     Checks for a '_Rec' subfolder and processes reconstructed TIFF stacks if present.
 
     Args:
         parent_dir (str): Path to the parent directory.
         tiff_extension (str): Extension for the TIFF files.
+        **kwargs: Passed to process_all_stacks (executor, max_workers, chunk_size, sample).
 
     Returns:
         list: Processed metadata for reconstructed TIFF stacks, or None if no '_Rec' folder exists.
@@ -57,7 +58,7 @@ def process_reconstruction_subfolder(parent_dir, tiff_extension):
     if os.path.exists(rec_dir) and os.path.isdir(rec_dir):
         print(f"Found reconstruction folder: {rec_dir}")
         rec_stacks = find_file_stacks(rec_dir, tiff_extension)
-        return process_all_stacks(rec_stacks, extract_tiff)
+        return process_all_stacks(rec_stacks, extract_tiff, **kwargs)
 
     return None
 
@@ -70,12 +71,20 @@ def main():
     parser.add_argument("--log_ext", type=str, default="log", help="Extension for the Bruker log file (default: log).")
     parser.add_argument("--tiff_ext", type=str, default="tif", help="Extension for the TIFF files (default: tif).")
     parser.add_argument("--output", type=str, help="Path to save the combined metadata as a YAML file.")
+    parser.add_argument("--executor", type=str, default="process", choices=["serial", "thread", "process"],
+                        help="Backend for metadata extraction (default: process).")
+    parser.add_argument("--workers", type=int, help="Number of workers (default: CPU count).")
+    parser.add_argument("--chunk_size", type=int, help="Files per worker task (default: automatic).")
+    parser.add_argument("--sample", type=int,
+                        help="Only read the first, last and this many evenly spaced files per stack, "
+                             "unless their key tags differ (default: read all).")
 
     args = parser.parse_args()
 
     scan_directory = args.scan_directory
     log_extension = args.log_ext
     tiff_extension = args.tiff_ext
+    extraction = dict(executor=args.executor, max_workers=args.workers, chunk_size=args.chunk_size, sample=args.sample)
 
     # Find the log file in the scan directory
     log_file = None
@@ -90,10 +99,10 @@ def main():
 
     # Process raw TIFF stacks in the directory
     raw_stacks = find_file_stacks(scan_directory, tiff_extension)
-    processed_raw_stacks = process_all_stacks(raw_stacks, extract_tiff)
+    processed_raw_stacks = process_all_stacks(raw_stacks, extract_tiff, **extraction)
 
     # Check for and process reconstructed TIFF stacks
-    processed_rec_stacks = process_reconstruction_subfolder(scan_directory, tiff_extension)
+    processed_rec_stacks = process_reconstruction_subfolder(scan_directory, tiff_extension, **extraction)
 
     # Combine metadata
     combined_metadata = combine_log_and_stack(log_file, processed_raw_stacks, processed_rec_stacks)
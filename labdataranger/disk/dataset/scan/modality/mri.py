@@ -1,10 +1,12 @@
 import os
 import argparse
+from functools import partial
 from labdataranger.disk.dataset.scan.format import (
     find_file_stacks,
     process_all_stacks,
     extract_dicom,
 )
+from labdataranger.disk.dataset.scan.format.dicom import KEY_TAGS
 import yaml
 
 
@@ -13,7 +15,7 @@ def combine_mri_metadata(dcm_metadata, log_metadata=None):
     Combines metadata from DICOM files and an optional metadata log file.
 
     Args:
-        dcm_metadata (list): List of metadata dictionaries from DICOM files.
+        dcm_metadata (list): Processed DICOM stacks, as returned by process_all_stacks.
         log_metadata (dict, optional): Metadata from a log file (if provided).
 
     Returns:
@@ -54,7 +56,8 @@ def parse_metadata_log(log_file_path):
     return log_metadata
 
 
-def process_mri_directory(scan_directory, dcm_extension, log_file=None):
+def process_mri_directory(scan_directory, dcm_extension, log_file=None, dicom_tags=None, full_headers=False,
+                          executor="serial", max_workers=None, chunk_size=None, sample=None):
     """
     Processes an MRI dataset directory to extract DICOM metadata and optionally parse a log file.
 
@@ -62,13 +65,35 @@ def process_mri_directory(scan_directory, dcm_extension, log_file=None):
         scan_directory (str): Path to the directory containing the MRI dataset.
         dcm_extension (str): Extension for the DICOM files.
         log_file (str, optional): Path to a metadata log file.
+        dicom_tags (list, optional): DICOM keywords to read; all other tags are skipped.
+        full_headers (bool, optional): Keep every slice's full header instead of the
+            shared header plus per-slice differences.
+        executor (str, optional): 'serial', 'thread' or 'process' backend for extraction.
+        max_workers (int, optional): Number of workers for the thread/process backends.
+        chunk_size (int, optional): Files per task handed to a worker.
+        sample (int, optional): Read only the first, last and this many evenly spaced slices
+            per stack, unless their image size or bit depth differ.
 
     Returns:
         dict: Combined metadata for the MRI scan.
     """
-    # Process DICOM stacks
+    if sample is not None and dicom_tags:
+        unchecked = [_t for _t in KEY_TAGS if _t not in dicom_tags]
+        if unchecked:
+            print(f"Warning: --tags leaves out {', '.join(unchecked)}; sampled stacks can't be checked "
+                  f"for consistency without them and may be read in full")
+
+    # Process DICOM stacks (headers only, pixel data is never read)
     dicom_stacks = find_file_stacks(scan_directory, dcm_extension)
-    processed_dicom_metadata = process_all_stacks(dicom_stacks, extract_dicom)
+    processed_dicom_metadata = process_all_stacks(
+        dicom_stacks,
+        partial(extract_dicom, specific_tags=dicom_tags),
+        deduplicate=not full_headers,
+        executor=executor,
+        max_workers=max_workers,
+        chunk_size=chunk_size,
+        sample=sample
+    )
 
     # Parse optional log file
     log_metadata = None
@@ -85,11 +110,22 @@ def main():
     parser.add_argument("--dcm_ext", type=str, default="dcm", help="Extension for DICOM files (default: dcm).")
     parser.add_argument("--log_file", type=str, help="Path to an optional metadata log file.")
     parser.add_argument("--output", type=str, help="Path to save the combined metadata as a YAML file.")
+    parser.add_argument("--tags", type=str, nargs="+", help="Only read these DICOM keywords (default: all).")
+    parser.add_argument("--full_headers", action="store_true", help="Store every slice's full header instead of shared + per-slice tags.")
+    parser.add_argument("--executor", type=str, default="process", choices=["serial", "thread", "process"],
+                        help="Backend for metadata extraction (default: process).")
+    parser.add_argument("--workers", type=int, help="Number of workers (default: CPU count).")
+    parser.add_argument("--chunk_size", type=int, help="Files per worker task (default: automatic).")
+    parser.add_argument("--sample", type=int,
+                        help="Only read the first, last and this many evenly spaced files per stack, "
+                             "unless their key tags differ (default: read all).")
 
     args = parser.parse_args()
 
     # Process the MRI directory
-    combined_metadata = process_mri_directory(args.scan_directory, args.dcm_ext, args.log_file)
+    combined_metadata = process_mri_directory(
+        args.scan_directory, args.dcm_ext, args.log_file, args.tags, args.full_headers,
+        executor=args.executor, max_workers=args.workers, chunk_size=args.chunk_size, sample=args.sample)
 
     # Save or display the metadata
     if args.output:
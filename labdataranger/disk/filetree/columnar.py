@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import pickle
+import shutil
+import numpy as np
+from pathlib import Path
+from collections import deque
+from functools import lru_cache
+
+
+COLUMNAR_SUFFIX = '.cols'
+FORMAT_VERSION = 1
+ARRAYS = ('parent', 'name_offset', 'type_code', 'size', 'created', 'mtime_ns', 'file_count', 'newest_mtime_ns')
+
+
+def is_columnar_checkpoint(file_name):
+    return str(file_name).endswith(COLUMNAR_SUFFIX) or os.path.isdir(file_name)
+
+
+def _ctime_to_seconds(s):
+    if not s:
+        return -1
+    return int(time.mktime(time.strptime(s)))
+
+
+@lru_cache(maxsize=65536)
+def _seconds_to_ctime(seconds):
+    return None if seconds < 0 else time.ctime(seconds)
+
+
+def ctime_strings(seconds):
+    """ ``time.ctime`` strings for an array of seconds (None where unknown). """
+    return [_seconds_to_ctime(_s) for _s in np.asarray(seconds, dtype=np.int64).tolist()]
+
+
+class ColumnarTree:
+    """
+    Flat, column-oriented form of a FileTree ``file_tree`` dict.
+
+    Nodes are stored breadth-first with the base folder at index 0, so the
+    ``parent`` column is sorted and the children of any node form one
+    contiguous slice. Each column is an int64 (``type_code`` int16) array:
+
+        parent           index of the parent node, -1 for the base
+        name_offset      n + 1 offsets into the UTF-8 ``names`` buffer
+        type_code        index into ``types``; 'folder' is always 0
+        size             file size, or cumulative size for folders
+        created          creation time in seconds, -1 if unknown
+        mtime_ns         modification time in ns
+        file_count       files below a folder (1 for files)
+        newest_mtime_ns  newest modification time below a folder
+
+    Parsed file metadata lives in a separate pickled blob keyed by node index
+    and is only read when first needed. On disk the tree is a directory of
+    ``.npy`` files that ``load`` memory-maps by default.
+    """
+
+    def __init__(self, columns, names, types, base_directory=None, metadata=None, path=None):
+        self.columns = columns
+        self.names = names
+        self.types = list(types)
+        self.base_directory = base_directory
+        self.path = path
+        self._metadata = metadata
+
+    def __len__(self):
+        return len(self.columns['parent'])
+
+    @classmethod
+    def from_file_tree(cls, file_tree, base_directory=None):
+        """ Flatten a nested ``file_tree`` dict (as built by FileTree.collect_file_tree). """
+        types = ['folder']
+        type_codes = {'folder': 0}
+        columns = {_k: [] for _k in ARRAYS if _k != 'name_offset'}
+        names = []
+        metadata = {}
+
+        queue = deque([(-1, 'base', file_tree['base'])])
+        while queue:
+            parent, name, node = queue.popleft()
+            index = len(names)
+            is_folder = node.get('type') == 'folder'
+            names.append(os.fsencode(name))
+
+            type_code = type_codes.get(node['type'])
+            if type_code is None:
+                type_code = type_codes[node['type']] = len(types)
+                types.append(node['type'])
+
+            created = _ctime_to_seconds(node.get('created'))
+            if 'mtime_ns' in node:
+                mtime_ns = node['mtime_ns']
+            else:
+                mtime_ns = max(_ctime_to_seconds(node.get('modified')), 0) * 10**9
+
+            columns['parent'].append(parent)
+            columns['type_code'].append(type_code)
+            columns['size'].append(node.get('size') or 0)
+            columns['created'].append(created)
+            columns['mtime_ns'].append(mtime_ns)
+            columns['file_count'].append(node.get('file_count', 0) if is_folder else 1)
+            columns['newest_mtime_ns'].append(node.get('newest_mtime_ns', mtime_ns))
+
+            if is_folder:
+                for child_name, child in node['contents'].items():
+                    if isinstance(child, dict):
+                        queue.append((index, child_name, child))
+            elif node.get('metadata'):
+                metadata[index] = node['metadata']
+
+        name_offset = np.zeros(len(names) + 1, dtype=np.int64)
+        np.cumsum([len(_n) for _n in names], out=name_offset[1:])
+        arrays = {
+            _k: np.asarray(_v, dtype=np.int16 if _k == 'type_code' else np.int64)
+            for _k, _v in columns.items()
+        }
+        arrays['name_offset'] = name_offset
+        return cls(
+            arrays,
+            np.frombuffer(b''.join(names), dtype=np.uint8),
+            types,
+            base_directory=base_directory,
+            metadata=metadata
+        )
+
+    def save(self, path):
+        """ Write the tree as a directory of .npy arrays plus a metadata blob. """
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        tmp_path.mkdir(parents=True)
+
+        for _k in ARRAYS:
+            np.save(tmp_path / f"{_k}.npy", np.ascontiguousarray(self.columns[_k]))
+        np.save(tmp_path / "names.npy", np.ascontiguousarray(self.names))
+        with open(tmp_path / "metadata.pkl", 'wb') as f:
+            pickle.dump(self.metadata, f)
+        with open(tmp_path / "header.json", 'w') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'count': len(self),
+                'types': self.types,
+                'base_directory': str(self.base_directory) if self.base_directory is not None else None,
+            }, f, indent=4)
+
+        if path.exists():
+            shutil.rmtree(path) if path.is_dir() else path.unlink()
+        tmp_path.rename(path)
+        self.path = path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """ Open a saved tree; arrays are memory-mapped unless ``mmap=False``. """
+        path = Path(path)
+        with open(path / "header.json", 'r') as f:
+            header = json.load(f)
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar checkpoint version {header['version']} in {path}")
+        mmap_mode = 'r' if mmap else None
+        columns = {_k: np.load(path / f"{_k}.npy", mmap_mode=mmap_mode) for _k in ARRAYS}
+        base_directory = header['base_directory']
+        return cls(
+            columns,
+            np.load(path / "names.npy", mmap_mode=mmap_mode),
+            header['types'],
+            base_directory=Path(base_directory) if base_directory is not None else None,
+            path=path
+        )
+
+    @property
+    def metadata(self):
+        """ Parsed file metadata by node index, read from disk on first use. """
+        if self._metadata is None:
+            if self.path is None:
+                self._metadata = {}
+            else:
+                with open(Path(self.path) / "metadata.pkl", 'rb') as f:
+                    self._metadata = pickle.load(f)
+        return self._metadata
+
+    def name(self, index):
+        start, end = self.columns['name_offset'][index:index + 2]
+        return os.fsdecode(self.names[start:end].tobytes())
+
+    def name_list(self):
+        """ Names of all nodes, decoded in one pass. """
+        names = self.names.tobytes()
+        offsets = self.columns['name_offset'].tolist()
+        return [os.fsdecode(names[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+
+    def folder_paths(self):
+        """ Folder path relative to the base ('' for the base) -> node index. """
+        parent = self.columns['parent']
+        folders = np.flatnonzero(np.asarray(self.columns['type_code']) == 0).tolist()
+        paths = {}
+        by_index = {}
+        for index in folders:
+            if index == 0:
+                path = ''
+            else:
+                parent_path = by_index[int(parent[index])]
+                path = f"{parent_path}/{self.name(index)}" if parent_path else self.name(index)
+            by_index[index] = path
+            paths[path] = index
+        return paths
+
+    def children(self, index):
+        """ Range of node indices directly below ``index``. """
+        parent = self.columns['parent']
+        return range(
+            int(np.searchsorted(parent, index, side='left')),
+            int(np.searchsorted(parent, index, side='right'))
+        )
+
+    def _build_node(self, type_name, size, created, mtime_ns, file_count, newest_mtime_ns, index):
+        node = {
+            'type': type_name,
+            'size': size,
+            'created': _seconds_to_ctime(created),
+            'modified': _seconds_to_ctime(mtime_ns // 10**9),
+            'mtime_ns': mtime_ns,
+        }
+        if type_name == 'folder':
+            node['contents'] = {}
+            node['file_count'] = file_count
+            node['newest_mtime_ns'] = newest_mtime_ns
+        else:
+            node['contents'] = None
+            node['metadata'] = self.metadata.get(index, {})
+        return node
+
+    def node(self, index):
+        """ Rebuild the dict for one node, without its children. """
+        columns = self.columns
+        return self._build_node(
+            self.types[columns['type_code'][index]],
+            *(int(columns[_k][index]) for _k in ('size', 'created', 'mtime_ns', 'file_count', 'newest_mtime_ns')),
+            index
+        )
+
+    def subtree(self, index):
+        """ Rebuild the nested dict for the node at ``index`` and everything below it. """
+        if index == 0:
+            return self.to_file_tree()['base']
+        root = self.node(index)
+        queue = deque([(index, root)])
+        while queue:
+            parent, parent_node = queue.popleft()
+            for child in self.children(parent):
+                child_node = self.node(child)
+                parent_node['contents'][self.name(child)] = child_node
+                if child_node['type'] == 'folder':
+                    queue.append((child, child_node))
+        return root
+
+    def to_file_tree(self):
+        """ Rebuild the complete nested ``file_tree`` dict. """
+        # One linear pass over plain lists; parents always come before children
+        columns = {_k: self.columns[_k].tolist() for _k in ARRAYS}
+        types = [self.types[_c] for _c in columns['type_code']]
+        names = self.name_list()
+        nodes = []
+        for i, (parent, size, created, mtime_ns, file_count, newest) in enumerate(zip(
+                columns['parent'], columns['size'], columns['created'],
+                columns['mtime_ns'], columns['file_count'], columns['newest_mtime_ns'])):
+            node = self._build_node(types[i], size, created, mtime_ns, file_count, newest, i)
+            nodes.append(node)
+            if parent >= 0:
+                nodes[parent]['contents'][names[i]] = node
+        return {'base': nodes[0]}
@@ -0,0 +1,85 @@
+from array import array
+from bisect import bisect_right
+
+
+class PathIndex:
+    """
+    Sorted, front-coded index of tree paths for prefix lookups.
+
+    Paths are sorted and cut into blocks of ``block_size``. Each block keeps its
+    first path in full; the others are stored as the length of the prefix they
+    share with the previous path plus the remaining suffix, all suffixes of a
+    block joined into one string. Deep survey paths share most of their
+    characters, so this stores a fraction of the full strings. A prefix lookup
+    bisects the block heads and decodes forward from there, stopping at the
+    first path past the prefix or at ``limit`` results.
+    """
+
+    def __init__(self, paths, block_size=16):
+        self.block_size = block_size
+        self._heads = []
+        self._shared = []
+        self._suffixes = []
+        self._count = 0
+
+        previous = None
+        shared, suffixes = None, None
+        for path in sorted(set(paths)):
+            if self._count % block_size == 0:
+                self._heads.append(path)
+                shared, suffixes = array('I'), []
+                self._shared.append(shared)
+                self._suffixes.append(suffixes)
+            else:
+                n = _common_prefix_length(previous, path)
+                shared.append(n)
+                suffixes.append(path[n:])
+            previous = path
+            self._count += 1
+        self._suffixes = ['\0'.join(_s) for _s in self._suffixes]
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for block in range(len(self._heads)):
+            yield from self._decode_block(block)
+
+    def __contains__(self, path):
+        return self.prefix(path, limit=1) == [path]
+
+    def _decode_block(self, block):
+        path = self._heads[block]
+        yield path
+        if self._shared[block]:
+            for n, suffix in zip(self._shared[block], self._suffixes[block].split('\0')):
+                path = path[:n] + suffix
+                yield path
+
+    def prefix(self, prefix, limit=None):
+        """ Paths starting with ``prefix`` in sorted order, at most ``limit`` of them. """
+        results = []
+        if not self._heads or limit == 0:
+            return results
+        block = max(bisect_right(self._heads, prefix) - 1, 0)
+        for block in range(block, len(self._heads)):
+            for path in self._decode_block(block):
+                if path.startswith(prefix):
+                    results.append(path)
+                    if limit is not None and len(results) >= limit:
+                        return results
+                elif path > prefix:
+                    return results
+        return results
+
+
+def _common_prefix_length(a, b):
+    # Binary search over slice comparisons, which run in C
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
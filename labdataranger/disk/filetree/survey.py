@@ -1,8 +1,10 @@
 import os
+import stat
 import logging
 import networkx as nx
 from pathlib import Path
 import time
+import numpy as np
 import pandas as pd
 import glob
 from PIL import Image
@@ -10,7 +12,22 @@ from PIL.TiffTags import TAGS
 import pickle
 import os
 import re
-import networkx as nx
+import queue
+import threading
+import concurrent.futures
+from collections import Counter, deque
+from .columnar import ColumnarTree, COLUMNAR_SUFFIX, is_columnar_checkpoint, ctime_strings
+from .index import PathIndex
+
+
+FILE_COLUMNS = {
+    'type': object, 'size': np.int64, 'created': object, 'modified': object,
+    'mtime_ns': np.int64, 'metadata': object, 'name': object
+}
+FOLDER_COLUMNS = {
+    'type': object, 'size': np.int64, 'file_count': np.int64, 'created': object,
+    'modified': object, 'newest_modified': object, 'name': object
+}
 
 
 def get_base_dirs(base_path):
@@ -21,6 +38,27 @@ def get_base_dirs(base_path):
     return base_dirs
 
 
+def _suffix(name):
+    """ Same result as ``Path(name).suffix`` without building a Path. """
+    i = name.rfind('.')
+    if 0 < i < len(name) - 1:
+        return name[i:]
+    return ''
+
+
+def _graphml_file_name(file_name):
+    return str(file_name).replace('.pkl', '.graphml').replace(COLUMNAR_SUFFIX, '.graphml')
+
+
+def _mtime_ns(node):
+    """ Modification time of a tree node in ns, from checkpoints old and new. """
+    if 'mtime_ns' in node:
+        return node['mtime_ns']
+    if node.get('modified'):
+        return int(time.mktime(time.strptime(node['modified']))) * 10**9
+    return 0
+
+
 def format_property_key(key):
     return to_lower_camel_case(convert_chars_for_neo4j(key))
 
@@ -43,6 +81,9 @@ def process_directory(
     skips=['System Volume Information','$RECYCLE.BIN'],
     checkpoint_fstr='.labdataranger.pkl',
     log_fstr='.labdataranger.out',
+    incremental=False,
+    trust_folder_mtime=False,
+    metadata_workers=None,
     verbose=False):
     
     checkpoint_file = os.path.join(base_directory_path, checkpoint_fstr)
@@ -61,50 +102,313 @@ def process_directory(
         log_file=log_file, 
         checkpoint_file=checkpoint_file        
     )
-    ft.collect_file_tree()
+    ft.collect_file_tree(
+        incremental=incremental,
+        trust_folder_mtime=trust_folder_mtime,
+        metadata_workers=metadata_workers
+    )
     ft.save_state(checkpoint_file)
 
     return ft
 
 
-def process_parallel(base_path, 
-                     max_workers=56, 
-                     verbose=False):
+def _mount_point(path):
+    path = os.path.abspath(path)
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+class ForestSurvey:
+    """ Surveys every tree of a forest with one pool of work-stealing threads.
+
+    Each base directory from ``get_base_dirs`` becomes a FileTree, but the unit
+    of work is a single folder listing: scanning a folder pushes its subfolders
+    onto the worker's own deque, and idle workers steal the oldest (shallowest)
+    folders from the others. A large project folder is therefore split across
+    all workers instead of pinning one thread. At most ``max_io_per_mount``
+    listings run at once against any one mount point.
+
+    Finished trees are saved to their checkpoints from the calling thread while
+    the workers keep walking the rest of the forest.
+    """
+
+    def __init__(self, base_path,
+                 skips=['System Volume Information', '$RECYCLE.BIN'],
+                 checkpoint_fstr='.labdataranger.pkl',
+                 log_fstr='.labdataranger.out',
+                 max_workers=None,
+                 max_io_per_mount=8,
+                 incremental=False,
+                 trust_folder_mtime=False,
+                 metadata_workers=None,
+                 metadata_batch_size=64,
+                 verbose=False):
+        self.base_path = base_path
+        self.skips = skips
+        self.checkpoint_fstr = checkpoint_fstr
+        self.log_fstr = log_fstr
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.max_io_per_mount = max_io_per_mount
+        self.incremental = incremental
+        self.trust_folder_mtime = trust_folder_mtime
+        self.metadata_workers = metadata_workers
+        self.metadata_batch_size = metadata_batch_size
+        self.verbose = verbose
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-    
-        futures = {
-            executor.submit(process_directory, base_dir): {
-                'base': base_dir, 'name': dir_name
-            } for dir_name, base_dir 
-            in get_base_dirs(base_path).items()
+        self._deques = [deque() for _ in range(self.max_workers)]
+        self._cv = threading.Condition()
+        self._outstanding = 0
+        self._mount_semaphores = {}
+        self._finished = queue.Queue()
+        self._trees = {}
+
+    def _push(self, worker, tree_state, task):
+        with self._cv:
+            self._outstanding += 1
+            tree_state['outstanding'] += 1
+            self._deques[worker].append((tree_state, task))
+            self._cv.notify()
+
+    def _next_task(self, worker):
+        try:
+            return self._deques[worker].pop()
+        except IndexError:
+            pass
+        for offset in range(1, self.max_workers):
+            try:
+                return self._deques[(worker + offset) % self.max_workers].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def _worker(self, worker):
+        while True:
+            item = self._next_task(worker)
+            if item is None:
+                with self._cv:
+                    if self._outstanding == 0:
+                        return
+                    self._cv.wait(timeout=0.05)
+                continue
+
+            tree_state, (folder_path, parts, node, previous) = item
+            ft = tree_state['tree']
+            try:
+                if tree_state['error'] is None:
+                    with self._mount_semaphores[tree_state['mount']]:
+                        subfolders = ft._scan_folder(folder_path, parts, node, previous)
+                    for task in subfolders:
+                        self._push(worker, tree_state, task)
+            except Exception as e:
+                tree_state['error'] = e
+            finally:
+                with self._cv:
+                    self._outstanding -= 1
+                    tree_state['outstanding'] -= 1
+                    if tree_state['outstanding'] == 0:
+                        tree_state['walked'] = time.perf_counter()
+                        self._finished.put(tree_state)
+                    if self._outstanding == 0:
+                        self._cv.notify_all()
+
+    def _open_tree(self, name, base_dir, pipeline_executor):
+        checkpoint_file = os.path.join(base_dir, self.checkpoint_fstr)
+        ft = FileTree(
+            base_dir,
+            self.skips,
+            log_file=os.path.join(base_dir, self.log_fstr),
+            checkpoint_file=checkpoint_file if self.incremental else None
+        )
+        pipeline = None
+        if pipeline_executor is not None:
+            pipeline = MetadataPipeline(ft, batch_size=self.metadata_batch_size, executor=pipeline_executor)
+        mount = _mount_point(base_dir)
+        if mount not in self._mount_semaphores:
+            self._mount_semaphores[mount] = threading.BoundedSemaphore(self.max_io_per_mount)
+        return {
+            'name': name,
+            'base': base_dir,
+            'checkpoint': checkpoint_file,
+            'tree': ft,
+            'mount': mount,
+            'outstanding': 0,
+            'error': None,
+            'start': time.perf_counter(),
+            'walked': None,
+            'root': ft._start_survey(self.incremental, self.trust_folder_mtime, pipeline),
         }
-        
-    
-        for future in concurrent.futures.as_completed(futures):
-        
-            _dir = futures[future]
-            
+
+    def _finish_tree(self, tree_state):
+        ft = tree_state['tree']
+        if tree_state['error'] is None:
             try:
-                result = future.result()
-                if verbose:
-                    print(f"Processing completed for: {result.base_directory}")
-                    print(f"                          {_dir['name']}")
-                    
-            except Exception as exc:
-                print(f"Error processing {_dir['base']}: {exc}")
+                ft._finish_survey()
+                ft.save_state(tree_state['checkpoint'])
+            except Exception as e:
+                tree_state['error'] = e
+        elapsed = time.perf_counter() - tree_state['start']
+        counts = ft.survey_counts
+        report = {
+            'name': tree_state['name'],
+            'base': tree_state['base'],
+            'mount': tree_state['mount'],
+            'folders': counts['folders'],
+            'files': counts['files'],
+            'bytes': counts['bytes'],
+            'parsed': counts['parsed'],
+            'reused': counts['reused'],
+            'walk_seconds': tree_state['walked'] - tree_state['start'],
+            'seconds': elapsed,
+            'entries_per_second': (counts['folders'] + counts['files']) / elapsed if elapsed else None,
+            'error': None if tree_state['error'] is None else str(tree_state['error']),
+        }
+        if self.verbose:
+            if report['error']:
+                print(f"Error processing {report['base']}: {report['error']}")
+            else:
+                print(f"Processing completed for: {report['base']}")
+                print(f"                          {report['files']} files, {report['folders']} folders "
+                      f"in {elapsed:.1f} s ({report['entries_per_second']:.0f} entries/s)")
+        return report
+
+    def run(self):
+        """ Survey every tree and return a DataFrame with one report row per tree. """
+        reports = []
+        pipeline_executor = None
+        if self.metadata_workers:
+            pipeline_executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.metadata_workers)
+        try:
+            for i, (name, base_dir) in enumerate(get_base_dirs(self.base_path).items()):
+                try:
+                    tree_state = self._open_tree(name, base_dir, pipeline_executor)
+                except Exception as e:
+                    reports.append({'name': name, 'base': base_dir, 'error': str(e)})
+                    continue
+                self._trees[name] = tree_state
+                self._push(i % self.max_workers, tree_state, tree_state['root'])
+
+            workers = [
+                threading.Thread(target=self._worker, args=(i,), daemon=True)
+                for i in range(self.max_workers)
+            ]
+            for worker in workers:
+                worker.start()
+            for _ in range(len(self._trees)):
+                reports.append(self._finish_tree(self._finished.get()))
+            for worker in workers:
+                worker.join()
+        finally:
+            if pipeline_executor is not None:
+                pipeline_executor.shutdown(cancel_futures=True)
+        return pd.DataFrame(reports)
+
+
+def process_parallel(base_path,
+                     max_workers=None,
+                     max_io_per_mount=8,
+                     verbose=False,
+                     **kwargs):
+    """ Survey each top-level folder of ``base_path`` into its own checkpoint.
+
+    See ForestSurvey for the scheduling and the remaining keyword arguments.
+    Returns a DataFrame with per-tree counts, timings and throughput.
+    """
+    return ForestSurvey(
+        base_path,
+        max_workers=max_workers,
+        max_io_per_mount=max_io_per_mount,
+        verbose=verbose,
+        **kwargs
+    ).run()
+
+
+def _parse_metadata_batch(tree_class, base_directory, file_paths):
+    """ Worker entry point: parse a batch of metadata files in a child process. """
+    parser = tree_class(base_directory)
+    return [parser.parse_metadata_file(file_path) for file_path in file_paths]
+
+
+class MetadataPipeline:
+    """ Parses queued metadata files in batches on a ProcessPoolExecutor.
+
+    ``submit`` takes a file node of the tree being built and its path; once the
+    batch fills it is handed to the pool while the walk carries on. ``close``
+    waits for every batch and writes the results into each node's ``metadata``.
+    Parsing runs on a fresh ``type(tree)`` instance in each worker, so custom
+    parsers on a FileTree subclass are used as long as the subclass can be
+    constructed from a base directory alone. Several pipelines can share one
+    ``executor``; only a pipeline that created its own pool shuts it down.
+    """
+
+    def __init__(self, tree, max_workers=None, batch_size=64, executor=None):
+        self.tree = tree
+        self.batch_size = batch_size
+        self._owns_executor = executor is None
+        self.executor = executor or concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._futures = []
+
+    def submit(self, node, file_path):
+        with self._lock:
+            self._pending.append((node, file_path))
+            if len(self._pending) >= self.batch_size:
+                self._submit_pending()
+
+    def _submit_pending(self):
+        batch, self._pending = self._pending, []
+        if batch:
+            future = self.executor.submit(
+                _parse_metadata_batch,
+                type(self.tree),
+                self.tree.base_directory,
+                [file_path for _, file_path in batch]
+            )
+            self._futures.append((future, batch))
+
+    def close(self):
+        """ Submit the last partial batch and merge all results into the tree. """
+        with self._lock:
+            self._submit_pending()
+        for future, batch in self._futures:
+            try:
+                results = future.result()
+            except Exception as e:
+                self.tree.log_message(f"Metadata batch failed ({e}); parsing {len(batch)} files inline")
+                results = [self.tree.parse_metadata_file(file_path) for _, file_path in batch]
+            for (node, _), meta_data in zip(batch, results):
+                node['metadata'] = meta_data
+        self._futures = []
+
+    def shutdown(self):
+        if self._owns_executor:
+            self.executor.shutdown(cancel_futures=True)
 
 
 class FileTree:
 
     def __init__(self, base_directory, skips=None, verbose=False, log_file=None, checkpoint_file=None):
 
-        self.graph = None
+        self._graph = None
+        self._file_tree = None
+        self._file_path_index = None
+        self._folder_index = None
+        self.checkpoint_file = None
+        self.columnar = None
         self.base_directory = Path(base_directory)
         self.skips = skips if skips is not None else []
         self.verbose = verbose
         self.log_file = log_file
-        self.file_tree = None
+        self.trust_folder_mtime = False
+        self.survey_counts = Counter()
+        self._metadata_pipeline = None
+        self._survey_tree = None
+        self._survey_folder_index = None
+        self._survey_lock = threading.Lock()
         self.file_types = (
             '.log',
             '.json',
@@ -124,15 +428,62 @@ class FileTree:
         if log_file:
             self.setup_logging(log_file, verbose)
 
-        if checkpoint_file and Path(checkpoint_file).is_file():
-            self.load_state(checkpoint_file)
-            self.build_file_path_index()
-            self.build_graph()
+        if checkpoint_file and Path(checkpoint_file).exists():
+            # Loaded on first use of file_tree, graph or file_path_index
+            self.checkpoint_file = checkpoint_file
 
         elif verbose:
                 print(f"No checkpoint available at {checkpoint_file}")
                 print(f"To create, run `manager.collect_file_tree()`")
 
+    @property
+    def file_tree(self):
+        """ Nested dict of the surveyed tree, read from the checkpoint on first access. """
+        if self._file_tree is None:
+            self._open_checkpoint()
+            if self._file_tree is None and self.columnar is not None:
+                self._file_tree = self.columnar.to_file_tree()
+                self._folder_index = None
+        return self._file_tree
+
+    @file_tree.setter
+    def file_tree(self, file_tree):
+        self._file_tree = file_tree
+        self.columnar = None
+        self.checkpoint_file = None
+        self._graph = None
+        self._file_path_index = None
+        self._folder_index = None
+
+    def _open_checkpoint(self):
+        """ Load a pending checkpoint; columnar ones stay as arrays until needed. """
+        if self.checkpoint_file is not None:
+            self.load_state(self.checkpoint_file)
+
+    @property
+    def graph(self):
+        """ networkx graph of the tree, built on first access. """
+        if self._graph is None and self.file_tree is not None:
+            self.build_graph()
+        return self._graph
+
+    @graph.setter
+    def graph(self, graph):
+        self._graph = graph
+
+    @property
+    def file_path_index(self):
+        """ PathIndex of every node for autocompletion, built on first access. """
+        if self._file_path_index is None:
+            self._open_checkpoint()
+            if self.columnar is not None or self.file_tree is not None:
+                self.build_file_path_index()
+        return self._file_path_index
+
+    @file_path_index.setter
+    def file_path_index(self, file_path_index):
+        self._file_path_index = file_path_index
+
     def is_folder_metadata(self, parent_folder_path, file_path):
         if '.log' in file_path:
             return True
@@ -142,46 +493,59 @@ class FileTree:
     def is_file_metadata(self, file_path):
         pass
 
-    def build_graph(self):
-        self.graph = nx.DiGraph()
+    def iter_graph(self):
+        """ Stream the elements of the tree's graph without building it.
+
+        Yields ``('node', node_id, attributes)`` and
+        ``('edge', source_id, target_id, attributes)`` in the order
+        build_graph adds them; every node comes before the edges that touch
+        it. Scan and metadata section nodes are collected per folder and
+        merged, so each node id is yielded once.
+        """
 
         def process_folder(folder_path, folder_meta, parent_id=None):
 
             folder_id = f"folder_{folder_path}"
             folder_absolute_path = os.path.abspath(folder_path)
 
-            self.graph.add_node(
-                folder_id,
-                label='Folder',
-                name=Path(folder_path).name,
-                filepath=folder_absolute_path
-            )
+            yield 'node', folder_id, {
+                'label': 'Folder',
+                'name': Path(folder_path).name,
+                'filepath': folder_absolute_path
+            }
 
             if parent_id:
-                self.graph.add_edge(
-                    parent_id,
-                    folder_id,
-                    relationship='contains_folder'
-                )
+                yield 'edge', parent_id, folder_id, {'relationship': 'contains_folder'}
+
+            scan_nodes, scan_edges = {}, {}
 
-            process_files(
+            yield from process_files(
                 folder_meta.get('contents', {}),
                 folder_id,
-                folder_path
+                folder_path,
+                scan_nodes,
+                scan_edges
             )
 
             process_metadata(
                 folder_meta.get('metadata', {}),
                 folder_id,
-                folder_absolute_path
+                folder_absolute_path,
+                scan_nodes,
+                scan_edges
             )
 
+            for node_id, attributes in scan_nodes.items():
+                yield 'node', node_id, attributes
+            for (source, target), attributes in scan_edges.items():
+                yield 'edge', source, target, attributes
+
             for subfolder_name, subfolder_meta in folder_meta.get('contents', {}).items():
                 if isinstance(subfolder_meta, dict) and subfolder_meta.get('type') == 'folder':
                     subfolder_path = os.path.join(folder_path, subfolder_name)
-                    process_folder(subfolder_path, subfolder_meta, folder_id)
+                    yield from process_folder(subfolder_path, subfolder_meta, folder_id)
 
-        def process_files(files_dict, parent_folder_id, parent_folder_path):
+        def process_files(files_dict, parent_folder_id, parent_folder_path, scan_nodes, scan_edges):
 
             for file_name, file_info in files_dict.items():
 
@@ -199,34 +563,23 @@ class FileTree:
                     _properties = file_info.copy()
                     _meta = _properties.pop('metadata', {})
                     _properties.update(_meta)
+                    _properties['label'] = 'File'
 
-                    self.graph.add_node(
-                        file_id,
-                        label='File',
-                        **_properties)
+                    yield 'node', file_id, _properties
 
-                    self.graph.add_edge(
-                        parent_folder_id,
-                        file_id,
-                        relationship='contains_file')
+                    yield 'edge', parent_folder_id, file_id, {'relationship': 'contains_file'}
 
                     if self.is_folder_metadata(parent_folder_path, file_info['filepath']):
 
-                        # process_metadata(
-                        #     file_info.get('metadata', {}),
-                        #     file_id,
-                        #     file_path
-                        # )
                         process_metadata(
                             file_info.get('metadata', {}),
                             parent_folder_id,
-                            parent_folder_path
+                            parent_folder_path,
+                            scan_nodes,
+                            scan_edges
                         )
 
-                else:
-                    pass
-
-        def process_metadata(meta_dict, parent_id, parent_path):
+        def process_metadata(meta_dict, parent_id, parent_path, scan_nodes, scan_edges):
 
             if meta_dict:
 
@@ -243,60 +596,33 @@ class FileTree:
                             for _k, _v in attrs.items()
                         }
 
-                        self.graph.add_node(
-                            section_id,
-                            label=section,
-                            **_properties
-                        )
+                        scan_nodes.setdefault(section_id, {}).update(label=section, **_properties)
 
                         scan_id = f"scan_{parent_path}"
 
-                        self.graph.add_node(
-                            scan_id,
-                            label='Scan',
-                            filepath=parent_path
-                        )
+                        scan_nodes.setdefault(scan_id, {}).update(label='Scan', filepath=parent_path)
 
-                        self.graph.add_edge(
-                            scan_id,
-                            section_id,
-                            relationship='involved'
-                        )
+                        scan_edges[(scan_id, section_id)] = {'relationship': 'involved'}
 
-                        self.graph.add_edge(
-                            scan_id,
-                            parent_id,
-                            relationship='stored_in'
-                        )
+                        scan_edges[(scan_id, parent_id)] = {'relationship': 'stored_in'}
 
-                    else:
-                        pass
+        if self.file_tree is None:
+            return
 
-                        # metadata_id = f"meta_{parent_path}"
-                        #
-                        # if not self.graph.has_node(metadata_id):
-                        #     _properties = {
-                        #         format_property_key(_k): _v
-                        #         for _k, _v in meta_dict.items()
-                        #     }
-                        #
-                        #     self.graph.add_node(
-                        #         metadata_id,
-                        #         label='Metadata',
-                        #         **_properties
-                        #     )
-                        #
-                        #     self.graph.add_edge(
-                        #         parent_id,
-                        #         metadata_id,
-                        #         relationship='has_metadata'
-                        #     )
-
-        process_folder(
+        yield from process_folder(
             self.base_directory,
             self.file_tree['base']
         )
 
+    def build_graph(self):
+        graph = nx.DiGraph()
+        for element in self.iter_graph():
+            if element[0] == 'node':
+                graph.add_node(element[1], **element[2])
+            else:
+                graph.add_edge(element[1], element[2], **element[3])
+        self.graph = graph
+
         print("File tree graph built.")
 
     def setup_logging(self, log_file, verbose):
@@ -382,150 +708,383 @@ class FileTree:
             self.log_message(f"Error processing TIFF file {file_path}: {e}")
             return {}
 
-    def update_folder_sizes(self, parts, file_size, tree):
-        current_tree = tree
-        for part in parts:
-            if part not in current_tree:
-                current_tree[part] = {'type': 'folder', 'size': 0, 'created': None, 'modified': None, 'contents': {}}
-            current_tree = current_tree[part]['contents']
-            if 'size' in current_tree:
-                current_tree['size'] += file_size
-            else:
-                current_tree['size'] = file_size
-
-    def collect_file_tree(self):
-        def add_to_tree(path, tree):
-            parts = path.relative_to(self.base_directory).parts
-            current_tree = tree
-            for part in parts[:-1]:
-                if part not in current_tree:
-                    current_tree[part] = {'type': 'folder', 'size': 0, 'created': None, 'modified': None,
-                                          'contents': {}}
-                current_tree = current_tree[part]['contents']
-            if path.is_dir():
-                stats = path.stat()
-                current_tree[parts[-1]] = {
-                    'type': 'folder',
-                    'size': 0,  # Placeholder size for folders
-                    'created': time.ctime(stats.st_ctime),
-                    'modified': time.ctime(stats.st_mtime),
-                    'contents': {}
-                }
-                self.log_message(f"Added directory: {path}")
-            elif path.is_file():
-                stats = path.stat()
-                meta_data = {}
-                if path.suffix in self.file_types:
-                    meta_data = self.parse_metadata_file(path)
-                current_tree[parts[-1]] = {
-                    'type': f'{path.suffix}',
-                    'size': stats.st_size,
-                    'created': time.ctime(stats.st_ctime),
-                    'modified': time.ctime(stats.st_mtime),
-                    'contents': None,
-                    'metadata': meta_data
-                }
-                self.log_message(f"Added file: {path}")
-                # Update the size of all parent directories
-                self.update_folder_sizes(parts[:-1], stats.st_size, tree)
+    def rollup_folder_stats(self):
+        """ Store cumulative size, file count and newest mtime on every folder node.
+
+        A single bottom-up pass after the walk, so ``list_folders`` only reads the
+        stored ``size``, ``file_count`` and ``newest_mtime_ns`` values. The
+        per-folder ``size`` totals that older surveys wrote into ``contents``
+        are dropped on the way.
+        """
+        stack = [(self.file_tree['base'], False)]
+        while stack:
+            node, children_done = stack.pop()
+            contents = node['contents']
+            if not children_done:
+                for name in [_k for _k, _v in contents.items() if not isinstance(_v, dict)]:
+                    del contents[name]
+                stack.append((node, True))
+                stack.extend((_v, False) for _v in contents.values() if _v.get('type') == 'folder')
+                continue
+
+            size, file_count, newest = 0, 0, _mtime_ns(node)
+            for child in contents.values():
+                size += child['size']
+                if child.get('type') == 'folder':
+                    file_count += child['file_count']
+                    newest = max(newest, child['newest_mtime_ns'])
+                else:
+                    file_count += 1
+                    newest = max(newest, _mtime_ns(child))
+            node['size'] = size
+            node['file_count'] = file_count
+            node['newest_mtime_ns'] = newest
+
+    def _folder_node(self, stats):
+        return {
+            'type': 'folder',
+            'size': 0,  # Placeholder size for folders
+            'created': time.ctime(stats.st_ctime),
+            'modified': time.ctime(stats.st_mtime),
+            'mtime_ns': stats.st_mtime_ns,
+            'contents': {}
+        }
 
-        # Ensure the base directory itself is included
-        file_tree = {
-            'base': {
-                'type': 'folder',
-                'size': 0,  # Placeholder size for base directory
-                'created': time.ctime(self.base_directory.stat().st_ctime),
-                'modified': time.ctime(self.base_directory.stat().st_mtime),
-                'contents': {}
-            }
+    def _file_node(self, suffix, stats, meta_data):
+        return {
+            'type': suffix,
+            'size': stats.st_size,
+            'created': time.ctime(stats.st_ctime),
+            'modified': time.ctime(stats.st_mtime),
+            'mtime_ns': stats.st_mtime_ns,
+            'contents': None,
+            'metadata': meta_data
         }
 
-        for item in self.base_directory.rglob('*'):
-            if not any(skip in str(item) for skip in self.skips):
-                add_to_tree(item, file_tree['base']['contents'])
-                if item.is_dir():
-                    self.log_message(f"Processing directory: {item}")
-                elif item.is_file():
-                    self.log_message(f"Processing file: {item}")
+    def _is_unchanged(self, previous, stats):
+        """ Compare a file node from an earlier survey with fresh ``stat`` results.
 
-        self.file_tree = file_tree
-        return file_tree
+        Checkpoints written before ``mtime_ns`` was recorded fall back to the
+        ``modified`` string, which only has one second resolution.
+        """
+        if not isinstance(previous, dict) or previous.get('type') == 'folder':
+            return False
+        if 'mtime_ns' in previous:
+            same_mtime = previous['mtime_ns'] == stats.st_mtime_ns
+        else:
+            same_mtime = previous['modified'] == time.ctime(stats.st_mtime)
+        return same_mtime and previous['size'] == stats.st_size
+
+    def _reuse_folder_listing(self, folder_path, parts, node, previous, counts):
+        """ Rebuild ``node`` from the previous survey of an unchanged folder.
+
+        Files are carried over as they were; subfolders are stat'ed and returned
+        so the walk can compare their own mtimes.
+        """
+        subfolders = []
+        for name, prev_child in previous['contents'].items():
+            if not isinstance(prev_child, dict):
+                continue
+            path = os.path.join(folder_path, name)
+            if prev_child.get('type') != 'folder':
+                node['contents'][name] = {
+                    _k: prev_child[_k] for _k in
+                    ('type', 'size', 'created', 'modified', 'mtime_ns', 'contents', 'metadata')
+                    if _k in prev_child
+                }
+                counts['files'] += 1
+                counts['reused'] += 1
+                counts['bytes'] += prev_child['size']
+                continue
+            try:
+                is_link = stat.S_ISLNK(os.stat(path, follow_symlinks=False).st_mode)
+                child = self._folder_node(os.stat(path))
+            except OSError as e:
+                self.log_message(f"Error reading {path}: {e}")
+                continue
+            node['contents'][name] = child
+            self._survey_folder_index['/'.join(parts + (name,))] = child
+            counts['folders'] += 1
+            if not is_link:
+                subfolders.append((path, parts + (name,), child, prev_child))
+        return subfolders
+
+    def _scan_folder(self, folder_path, parts, node, previous=None):
+        """ List one folder with os.scandir and add its entries to ``node``.
+
+        ``DirEntry`` type information comes from the directory listing itself, so
+        each entry costs at most one ``stat`` call. With ``previous`` (the same
+        folder from an earlier survey), metadata of unchanged files is reused
+        instead of parsed again. Returns the subfolders still to be walked as
+        ``(path, parts, node, previous)`` tuples.
+
+        Only ``node`` is written while listing, so different folders of one tree
+        can be scanned from several threads; the shared survey counts are
+        updated once per folder under a lock.
+        """
+        counts = Counter()
+        if (previous is not None and self.trust_folder_mtime
+                and previous.get('mtime_ns') == node['mtime_ns']):
+            counts['skipped_folders'] += 1
+            subfolders = self._reuse_folder_listing(folder_path, parts, node, previous, counts)
+            self._record_folder(parts, counts)
+            return subfolders
+
+        prev_contents = {}
+        if previous is not None:
+            prev_contents = previous.get('contents') or {}
+        contents = node['contents']
+        subfolders = []
+        try:
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    if any(skip in entry.path for skip in self.skips):
+                        continue
+                    try:
+                        if entry.is_dir():
+                            child = self._folder_node(entry.stat())
+                            contents[entry.name] = child
+                            self._survey_folder_index['/'.join(parts + (entry.name,))] = child
+                            counts['folders'] += 1
+                            self.log_message(f"Added directory: {entry.path}")
+                            # Match Path.rglob, which does not descend into symlinked folders
+                            if not entry.is_symlink():
+                                prev_child = prev_contents.get(entry.name)
+                                if not (isinstance(prev_child, dict) and prev_child.get('type') == 'folder'):
+                                    prev_child = None
+                                subfolders.append((entry.path, parts + (entry.name,), child, prev_child))
+                        elif entry.is_file():
+                            stats = entry.stat()
+                            suffix = _suffix(entry.name)
+                            prev_child = prev_contents.get(entry.name)
+                            meta_data = {}
+                            queue_metadata = False
+                            if self._is_unchanged(prev_child, stats):
+                                meta_data = prev_child.get('metadata', {})
+                                counts['reused'] += 1
+                            elif suffix in self.file_types:
+                                if self._metadata_pipeline is None:
+                                    meta_data = self.parse_metadata_file(entry.path)
+                                else:
+                                    queue_metadata = True
+                                counts['parsed'] += 1
+                            contents[entry.name] = self._file_node(suffix, stats, meta_data)
+                            if queue_metadata:
+                                self._metadata_pipeline.submit(contents[entry.name], entry.path)
+                            counts['files'] += 1
+                            counts['bytes'] += stats.st_size
+                            self.log_message(f"Added file: {entry.path}")
+                    except OSError as e:
+                        self.log_message(f"Error reading {entry.path}: {e}")
+        except OSError as e:
+            self.log_message(f"Error scanning directory {folder_path}: {e}")
+        self._record_folder(parts, counts)
+        return subfolders
+
+    def _record_folder(self, parts, counts):
+        with self._survey_lock:
+            self.survey_counts.update(counts)
+
+    def _start_survey(self, incremental=False, trust_folder_mtime=False, metadata_pipeline=None):
+        """ Reset survey state and return the walk task for the base directory. """
+        previous = self.file_tree['base'] if incremental and self.file_tree else None
+        self.trust_folder_mtime = trust_folder_mtime
+        self.survey_counts = Counter()
+        self._metadata_pipeline = metadata_pipeline
+
+        # Ensure the base directory itself is included
+        self._survey_tree = {'base': self._folder_node(self.base_directory.stat())}
+        self._survey_folder_index = {'': self._survey_tree['base']}
+        return str(self.base_directory), (), self._survey_tree['base'], previous
+
+    def _finish_survey(self):
+        """ Merge queued metadata and publish the tree built since ``_start_survey``. """
+        if self._metadata_pipeline is not None:
+            self._metadata_pipeline.close()
+            self._metadata_pipeline = None
+
+        self.log_message(
+            f"Surveyed {self.base_directory}: parsed {self.survey_counts['parsed']} files, "
+            f"reused {self.survey_counts['reused']}, "
+            f"skipped listing {self.survey_counts['skipped_folders']} unchanged folders")
+
+        self.file_tree, self._survey_tree = self._survey_tree, None
+        self._folder_index, self._survey_folder_index = self._survey_folder_index, None
+        self.rollup_folder_stats()
+        return self.file_tree
+
+    def collect_file_tree(self, incremental=False, trust_folder_mtime=False,
+                          metadata_workers=None, metadata_batch_size=64):
+        """ Walk ``base_directory`` with os.scandir and build the nested file tree.
+
+        Metadata files are parsed inline on the walking thread by default. With
+        ``metadata_workers`` set, the walk only queues them and a process pool of
+        that many workers parses them in batches of ``metadata_batch_size``; the
+        results are merged into the tree before this method returns.
+
+        With ``incremental=True`` the tree already loaded (e.g. from the checkpoint)
+        is used as a reference: files whose size and mtime are unchanged keep their
+        metadata instead of being parsed again. ``trust_folder_mtime=True`` also
+        skips listing folders whose own mtime is unchanged and carries their files
+        over as-is. A folder's mtime only changes when entries are added, removed
+        or renamed, so files rewritten in place inside such a folder are missed.
+        """
+        pipeline = None
+        if metadata_workers:
+            pipeline = MetadataPipeline(self, max_workers=metadata_workers, batch_size=metadata_batch_size)
+        try:
+            stack = [self._start_survey(incremental, trust_folder_mtime, pipeline)]
+            while stack:
+                folder_path, parts, node, prev_node = stack.pop()
+                self.log_message(f"Processing directory: {folder_path}")
+                stack.extend(self._scan_folder(folder_path, parts, node, prev_node))
+            return self._finish_survey()
+        finally:
+            self._metadata_pipeline = None
+            if pipeline is not None:
+                pipeline.shutdown()
 
     def build_file_path_index(self):
         """ Build an index of all file paths for autocompletion. """
-        self.file_path_index = []
+        paths = []
 
         def recurse_tree(tree, current_path):
             for name, meta in tree.items():
                 if isinstance(meta, dict) and 'type' in meta:
                     new_path = f"{current_path}/{name}" if current_path else name
-                    self.file_path_index.append(new_path)
+                    paths.append(new_path)
                     if meta['type'] == 'folder' and 'contents' in meta:
                         recurse_tree(meta['contents'], new_path)
 
-        if self.file_tree:
+        self._open_checkpoint()
+        if self._file_tree is None and self.columnar is not None:
+            # Parents precede children in the columnar layout, so one pass suffices
+            parent = self.columnar.columns['parent'].tolist()
+            names = self.columnar.name_list()
+            node_paths = ['base']
+            for i in range(1, len(parent)):
+                node_paths.append(f"{node_paths[parent[i]]}/{names[i]}")
+            paths = node_paths[1:]
+        elif self.file_tree:
             recurse_tree(self.file_tree['base']['contents'], 'base')
 
+        self.file_path_index = PathIndex(paths)
         print("File path index built.")
 
-    def autocomplete_path(self, prefix):
-        """ Autocomplete potential directory paths based on the index. """
-        return [path for path in self.file_path_index if path.startswith(prefix)]
+    def autocomplete_path(self, prefix, limit=None):
+        """ Autocomplete potential directory paths based on the index.
+
+        Returns at most ``limit`` matches, in sorted order.
+        """
+        return self.file_path_index.prefix(prefix, limit=limit)
+
+    @property
+    def folder_index(self):
+        """ Folder path relative to the base ('' for the base itself) -> folder.
+
+        Built once per tree, or during the survey that produced it. Values are
+        node dicts, or node indices while the tree is backed by a columnar
+        checkpoint.
+        """
+        if self._folder_index is None:
+            self._open_checkpoint()
+            if self._file_tree is None and self.columnar is not None:
+                self._folder_index = self.columnar.folder_paths()
+            elif self.file_tree is not None:
+                index = {'': self.file_tree['base']}
+                stack = [('', self.file_tree['base'])]
+                while stack:
+                    path, node = stack.pop()
+                    for name, child in node['contents'].items():
+                        if isinstance(child, dict) and child.get('type') == 'folder':
+                            child_path = f"{path}/{name}" if path else name
+                            index[child_path] = child
+                            stack.append((child_path, child))
+                self._folder_index = index
+        return self._folder_index
+
+    def _find_folder(self, path):
+        key = '/'.join(_i for _i in path.split('/') if len(_i) > 0)
+        try:
+            return self.folder_index[key]
+        except (KeyError, TypeError):
+            raise ValueError(f"Path '{path}' not found in the directory structure.")
 
     def get_directory_contents(self, path=''):
-        # parts = path.split('/')[1:]
-        parts = [_i for _i in path.split('/') if len(_i) > 0]
-        current_tree = self.file_tree['base']['contents']
-        for part in parts:
-            if part in current_tree:
-                current_tree = current_tree[part]['contents']
-            else:
-                raise ValueError(f"Path '{path}' not found in the directory structure.")
-        return current_tree
+        folder = self._find_folder(path)
+        if isinstance(folder, dict):
+            return folder['contents']
+        # Only rebuild the requested subtree from the columnar checkpoint
+        return self.columnar.subtree(folder)['contents']
 
     def list_files(self, directory=''):
-        _l = []
-
-        def process_files(tree):
-            for _k, _v in tree.items():
-                if isinstance(_v, dict) and _v.get('type') != 'folder':
-                    _d = _v.copy()
-                    del _d['contents']
-                    _d['name'] = _k
-                    _l.append(_d)
-
-        directory_contents = self.get_directory_contents(directory)
-        process_files(directory_contents)
-        return pd.DataFrame(_l)
+        folder = self._find_folder(directory)
+
+        if not isinstance(folder, dict):
+            columns = self.columnar.columns
+            children = self.columnar.children(folder)
+            codes = columns['type_code'][children.start:children.stop]
+            files = np.flatnonzero(codes != 0) + children.start
+            metadata = self.columnar.metadata
+            return pd.DataFrame({
+                'type': np.asarray(self.columnar.types, dtype=object)[columns['type_code'][files]],
+                'size': columns['size'][files],
+                'created': ctime_strings(columns['created'][files]),
+                'modified': ctime_strings(columns['mtime_ns'][files] // 10**9),
+                'mtime_ns': columns['mtime_ns'][files],
+                'metadata': [metadata.get(_i, {}) for _i in files.tolist()],
+                'name': [self.columnar.name(_i) for _i in files.tolist()],
+            }, columns=list(FILE_COLUMNS)).astype(FILE_COLUMNS)
+
+        files = [
+            (_k, _v) for _k, _v in folder['contents'].items()
+            if isinstance(_v, dict) and _v.get('type') != 'folder'
+        ]
+        return pd.DataFrame({
+            'type': [_v['type'] for _, _v in files],
+            'size': [_v['size'] for _, _v in files],
+            'created': [_v['created'] for _, _v in files],
+            'modified': [_v['modified'] for _, _v in files],
+            'mtime_ns': [_mtime_ns(_v) for _, _v in files],
+            'metadata': [_v.get('metadata', {}) for _, _v in files],
+            'name': [_k for _k, _ in files],
+        }, columns=list(FILE_COLUMNS)).astype(FILE_COLUMNS)
 
     def list_folders(self, directory=''):
-        _l = []
-
-        def folder_size_sum(tree):
-            _sum_size = 0
-            for _i, _contents in tree.items():
-                if isinstance(_contents, dict):
-                    if _contents['type'] == 'folder':
-                        _sum_size += folder_size_sum(_contents['contents'])
-                    else:
-                        _sum_size += _contents['size']
-            return _sum_size
-
-        def process_folders(tree):
-            for _k, _v in tree.items():
-                if isinstance(_v, dict) and _v.get('type') == 'folder':
-                    _d = {
-                        'type': _v['type'],
-                        'size': folder_size_sum(_v['contents']),
-                        'created': _v['created'],
-                        'modified': _v['modified'],
-                        'name': _k
-                    }
-                    _l.append(_d)
-
-        directory_contents = self.get_directory_contents(directory)
-        process_folders(directory_contents)
-        return pd.DataFrame(_l)
+        folder = self._find_folder(directory)
+
+        if not isinstance(folder, dict):
+            columns = self.columnar.columns
+            children = self.columnar.children(folder)
+            codes = columns['type_code'][children.start:children.stop]
+            folders = np.flatnonzero(codes == 0) + children.start
+            return pd.DataFrame({
+                'type': 'folder',
+                'size': columns['size'][folders],
+                'file_count': columns['file_count'][folders],
+                'created': ctime_strings(columns['created'][folders]),
+                'modified': ctime_strings(columns['mtime_ns'][folders] // 10**9),
+                'newest_modified': ctime_strings(columns['newest_mtime_ns'][folders] // 10**9),
+                'name': [self.columnar.name(_i) for _i in folders.tolist()],
+            }, columns=list(FOLDER_COLUMNS)).astype(FOLDER_COLUMNS)
+
+        # Columnar checkpoints always carry the rolled-up values
+        if 'file_count' not in self.file_tree['base']:
+            self.rollup_folder_stats()
+
+        folders = [
+            (_k, _v) for _k, _v in folder['contents'].items()
+            if isinstance(_v, dict) and _v.get('type') == 'folder'
+        ]
+        return pd.DataFrame({
+            'type': 'folder',
+            'size': [_v['size'] for _, _v in folders],
+            'file_count': [_v['file_count'] for _, _v in folders],
+            'created': [_v['created'] for _, _v in folders],
+            'modified': [_v['modified'] for _, _v in folders],
+            'newest_modified': ctime_strings([_v['newest_mtime_ns'] // 10**9 for _, _v in folders]),
+            'name': [_k for _k, _ in folders],
+        }, columns=list(FOLDER_COLUMNS)).astype(FOLDER_COLUMNS)
 
     def list_all(self, directory=''):
         files_df = self.list_files(directory)
@@ -540,30 +1099,44 @@ class FileTree:
                 print(f"CUSTOM TAG[{_k}]", img.tag[_k])
 
     def save_state(self, file_name, save_graph=False):
-        """ Save the necessary data structures of the ForestSurveyor to a file. """
-        state = {
-            'base_directory': self.base_directory,
-            'file_tree': self.file_tree
-        }
-        with open(file_name, 'wb') as f:
-            pickle.dump(state, f)
+        """ Save the necessary data structures of the ForestSurveyor to a file.
+
+        A ``file_name`` ending in ``.cols`` is written as a columnar checkpoint
+        (see ColumnarTree); anything else is pickled.
+        """
+        if is_columnar_checkpoint(file_name):
+            self.columnar = ColumnarTree.from_file_tree(self.file_tree, self.base_directory)
+            self.columnar.save(file_name)
+        else:
+            state = {
+                'base_directory': self.base_directory,
+                'file_tree': self.file_tree
+            }
+            with open(file_name, 'wb') as f:
+                pickle.dump(state, f)
         print(f"State saved to {file_name}.")
 
-        if self.graph is not None and save_graph:
-            graphml_file_name = str(file_name).replace('.pkl', '.graphml')
+        if save_graph and self.graph is not None:
+            graphml_file_name = _graphml_file_name(file_name)
             temp_graph = self.translate_for_graphml(self.graph)
             nx.write_graphml(temp_graph, graphml_file_name)
             print(f"Graph saved to {graphml_file_name}.")
 
     def load_state(self, file_name, load_graph=False):
         """ Load the necessary data structures of the ForestSurveyor from a file. """
-        with open(file_name, 'rb') as f:
-            state = pickle.load(f)
-            self.base_directory = state['base_directory']
-            self.file_tree = state['file_tree']
+        if is_columnar_checkpoint(file_name):
+            # Nested dicts are only rebuilt from the arrays when file_tree is used
+            self.file_tree = None
+            self.columnar = ColumnarTree.load(file_name)
+            self.base_directory = self.columnar.base_directory
+        else:
+            with open(file_name, 'rb') as f:
+                state = pickle.load(f)
+                self.base_directory = state['base_directory']
+                self.file_tree = state['file_tree']
         print(f"State loaded from {file_name}.")
 
-        graphml_file_name = str(file_name).replace('.pkl', '.graphml')
+        graphml_file_name = _graphml_file_name(file_name)
         if os.path.exists(graphml_file_name):
             if load_graph:
                 temp_graph = nx.read_graphml(graphml_file_name)
@@ -0,0 +1,97 @@
+import asyncio
+import neo4j
+from .driver import get_db_config, config_uri
+from .query import QUERIES
+
+
+def async_driver(config_file='db_config.json', config=None, **driver_options):
+    """ New ``neo4j.AsyncGraphDatabase`` driver for a db config.
+
+    Async drivers belong to the event loop they are used in, so unlike
+    driver.get_driver they are not shared; close them when done.
+    """
+    if config is None:
+        config = get_db_config(config_file=config_file)
+    return neo4j.AsyncGraphDatabase.driver(
+        config_uri(config), auth=(config.get('username'), config.get('password')), **driver_options)
+
+
+async def dataframe_async(query, parameters=None, database='neo4j', column_map=None, driver=None,
+                          config_file='db_config.json'):
+    """ Async counterpart of query.dataframe. """
+    own_driver = driver is None
+    if own_driver:
+        driver = async_driver(config_file=config_file)
+    try:
+        _df = await driver.execute_query(
+            query,
+            parameters_=parameters,
+            database_=database or None,
+            result_transformer_=neo4j.AsyncResult.to_df
+        )
+    finally:
+        if own_driver:
+            await driver.close()
+    if column_map:
+        _df.rename(columns=column_map, inplace=True)
+    return _df
+
+
+def _query_and_parameters(item):
+    if isinstance(item, str):
+        return item, None
+    return item[0], item[1]
+
+
+async def gather_dataframes(queries, database='neo4j', max_concurrency=8, driver=None,
+                            config_file='db_config.json', return_exceptions=False):
+    """ Run many queries concurrently, at most ``max_concurrency`` at a time.
+
+    ``queries`` holds query strings or ``(query, parameters)`` pairs, as a
+    list (results come back as a list in the same order) or a dict (results
+    come back under the same keys). With ``return_exceptions`` a failed
+    query returns its exception instead of cancelling the others; without
+    it the first failure cancels and awaits the rest before it is raised.
+    """
+    keys = list(queries) if isinstance(queries, dict) else None
+    items = [queries[_k] for _k in keys] if keys is not None else list(queries)
+
+    own_driver = driver is None
+    if own_driver:
+        driver = async_driver(config_file=config_file, max_connection_pool_size=max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(item):
+        query, parameters = _query_and_parameters(item)
+        async with semaphore:
+            return await dataframe_async(query, parameters=parameters, database=database, driver=driver)
+
+    tasks = [asyncio.ensure_future(run(_i)) for _i in items]
+    try:
+        results = await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    except BaseException:
+        # gather leaves the other queries running; stop them before their driver is closed
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        if own_driver:
+            await driver.close()
+    return dict(zip(keys, results)) if keys is not None else results
+
+
+def dataframes(queries, **kwargs):
+    """ Blocking wrapper around gather_dataframes for scripts.
+
+    Inside a running event loop (e.g. Jupyter) use
+    ``await gather_dataframes(...)`` instead.
+    """
+    return asyncio.run(gather_dataframes(queries, **kwargs))
+
+
+async def properties_by_labels(labels, **kwargs):
+    """ Properties of the nodes of every label, fetched concurrently; label -> DataFrame. """
+    named_query = QUERIES['properties_by_label']
+    return await gather_dataframes(
+        {_l: named_query.text({'label': _l}) for _l in labels}, **kwargs)
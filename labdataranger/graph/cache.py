@@ -0,0 +1,146 @@
+import re
+import json
+import time
+import pickle
+import hashlib
+import logging
+import threading
+import weakref
+from pathlib import Path
+from collections import OrderedDict
+
+
+_caches = weakref.WeakSet()
+_default_cache = None
+
+
+class QueryCache:
+    """
+    Opt-in cache of query results for graph.query.dataframe.
+
+    Results are keyed by query text, parameters, database and the URI of the
+    server they came from, expire after ``ttl`` seconds and the least
+    recently used ones are evicted beyond ``max_entries``. With ``path``
+    every result is also pickled into that directory, so it survives
+    restarts and can be shared by processes on the same machine until it
+    expires. Expired files are deleted when read, and the directory is kept
+    to ``max_entries`` files by removing the oldest. The loaders in
+    graph.store call invalidate_caches after writing, which empties every
+    cache of this process for that database; other processes only notice at
+    expiry.
+    """
+
+    def __init__(self, ttl=300, max_entries=128, path=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = Path(path) if path is not None else None
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(query, parameters=None, database=None, uri=None):
+        payload = json.dumps([query, parameters or {}, database, uri], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _file_name(self, key, database):
+        database = re.sub(r'[^A-Za-z0-9_.-]', '_', database or 'default')
+        return self.path / f"{database}__{key}.pkl"
+
+    def get(self, query, parameters=None, database=None, uri=None):
+        """ Cached result, or None if missing or expired. """
+        key = self.key(query, parameters, database, uri)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.path is not None:
+                entry = self._load(key, database)
+            if entry is None or entry[0] < now:
+                self._entries.pop(key, None)
+                if entry is not None and self.path is not None:
+                    self._file_name(key, database).unlink(missing_ok=True)
+                self.misses += 1
+                return None
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            self.hits += 1
+            return entry[2].copy()
+
+    def set(self, query, result, parameters=None, database=None, uri=None):
+        key = self.key(query, parameters, database, uri)
+        entry = (time.time() + self.ttl, database, result.copy())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+            if self.path is not None:
+                with open(self._file_name(key, database), 'wb') as f:
+                    pickle.dump(entry, f)
+                self._evict_files()
+
+    def _load(self, key, database):
+        file_name = self._file_name(key, database)
+        try:
+            with open(file_name, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Dropping unreadable query cache file {file_name}: {e}")
+            file_name.unlink(missing_ok=True)
+            return None
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _evict_files(self):
+        # The directory may be shared, so it is trimmed by file age rather than this process's LRU order
+        files = []
+        for file_name in self.path.glob('*.pkl'):
+            try:
+                files.append((file_name.stat().st_mtime, file_name))
+            except FileNotFoundError:
+                continue
+        if len(files) > self.max_entries:
+            files.sort()
+            for _, file_name in files[:len(files) - self.max_entries]:
+                file_name.unlink(missing_ok=True)
+
+    def invalidate(self, database=None):
+        """ Drop the results for ``database`` (and the default database), or all of them. """
+        with self._lock:
+            for key in [_k for _k, _e in self._entries.items()
+                        if database is None or _e[1] in (database, None)]:
+                del self._entries[key]
+            if self.path is not None:
+                patterns = ['*.pkl'] if database is None else [
+                    self._file_name('*', database).name, self._file_name('*', None).name]
+                for pattern in patterns:
+                    for file_name in self.path.glob(pattern):
+                        file_name.unlink(missing_ok=True)
+
+    def clear(self):
+        self.invalidate()
+
+
+def default_cache():
+    """ Process-wide cache used by ``dataframe(..., cache=True)``. """
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = QueryCache()
+    return _default_cache
+
+
+def invalidate_caches(database=None):
+    """ Invalidate every QueryCache of this process; called after writes to ``database``. """
+    for cache in list(_caches):
+        cache.invalidate(database)
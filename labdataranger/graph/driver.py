@@ -0,0 +1,91 @@
+import os
+import json
+import atexit
+import threading
+import neo4j
+from urllib.parse import urlsplit
+
+
+_drivers = {}
+_configs = {}
+_lock = threading.Lock()
+
+
+def get_db_config(config_file='db_config.json'):
+    with open(config_file, 'r') as file:
+        config = json.load(file)
+    for _i in ['uri', 'port', 'username', 'password']:
+        if not config.get(_i, False):
+            print(f"WARNING: '{_i}' not found in {config_file}.")
+    return config
+
+
+def _cached_db_config(config_file):
+    """ get_db_config, parsed again only when the file's modification time changes. """
+    path = os.path.abspath(config_file)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _configs.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = _configs[path] = (mtime, get_db_config(config_file=config_file))
+    return cached[1]
+
+
+def config_uri(config):
+    """ Connection URI of a db config; ``port`` is appended unless the URI has one. """
+    uri = config['uri']
+    if config.get('port') and urlsplit(uri).port is None:
+        uri = f"{uri.rstrip('/')}:{config['port']}"
+    return uri
+
+
+def get_driver(config_file='db_config.json', config=None, max_connection_pool_size=None,
+               liveness_check_timeout=None, verify=False, **driver_options):
+    """ Process-wide neo4j driver for a db config, created on first use.
+
+    Drivers are shared by everything asking for the same URI, credentials and
+    options, so their connection pool stays warm across queries. ``config``
+    (a dict like ``db_config.json``) takes precedence over ``config_file``.
+    ``liveness_check_timeout`` (s) checks pooled connections idle for longer
+    than that before reusing them. ``verify`` checks connectivity when the
+    driver is created. ``config_file`` is only parsed again once it changes
+    on disk. Shared drivers are closed at exit or by close_drivers;
+    don't close them yourself.
+    """
+    if config is None:
+        config = _cached_db_config(config_file)
+    if max_connection_pool_size is not None:
+        driver_options['max_connection_pool_size'] = max_connection_pool_size
+    if liveness_check_timeout is not None:
+        driver_options['liveness_check_timeout'] = liveness_check_timeout
+
+    uri = config_uri(config)
+    key = (uri, config.get('username'), config.get('password'), tuple(sorted(driver_options.items())))
+    with _lock:
+        driver = _drivers.get(key)
+        if driver is None or getattr(driver, '_closed', False):
+            driver = neo4j.GraphDatabase.driver(
+                uri, auth=(config.get('username'), config.get('password')), **driver_options)
+            if verify:
+                driver.verify_connectivity()
+            _drivers[key] = driver
+    return driver
+
+
+def driver_uri(driver):
+    """ URI a driver from get_driver was opened for, or None for any other driver. """
+    with _lock:
+        for key, shared in _drivers.items():
+            if shared is driver:
+                return key[0]
+    return None
+
+
+def close_drivers():
+    """ Close every shared driver; the next get_driver call opens a new one. """
+    with _lock:
+        while _drivers:
+            _, driver = _drivers.popitem()
+            driver.close()
+
+
+atexit.register(close_drivers)
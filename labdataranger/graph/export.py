@@ -0,0 +1,173 @@
+import csv
+import shlex
+from pathlib import Path
+from collections import OrderedDict
+from .store import SCHEMA_LABELS, SECTION_LABEL, node_key, key_group, node_properties
+from labdataranger.disk.filetree.survey import FileTree, get_base_dirs
+
+
+ARRAY_DELIMITER = ';'
+
+
+def csv_type(value):
+    """ neo4j-admin import type of a property value (see store.node_properties). """
+    if isinstance(value, list):
+        return (csv_type(value[0]) if value else 'string') + '[]'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'long'
+    if isinstance(value, float):
+        return 'double'
+    return 'string'
+
+
+def csv_value(value):
+    if isinstance(value, list):
+        return ARRAY_DELIMITER.join(csv_value(_v) for _v in value)
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+class CsvGraphExporter:
+    """
+    Writes graph elements as ``neo4j-admin database import`` CSV files.
+
+    Elements are the tuples yielded by FileTree.iter_graph and are written as
+    they arrive, so a tree never has to be built as a networkx graph. Nodes
+    go to one header/data file pair per label and property signature (names
+    and types), relationships to one pair per (type, start label group, end
+    label group). Folder, File and Scan nodes use their filepath as import
+    ID, metadata sections their ``sectionId``, each in an ID space of its own.
+    Only the import key of every node seen is kept in memory, to resolve the
+    relationship endpoints.
+    """
+
+    def __init__(self, out_dir, max_open_files=64):
+        self.out_dir = Path(out_dir)
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        if any(self.out_dir.glob('*.csv')):
+            raise FileExistsError(f"{self.out_dir} already contains CSV files")
+        self.max_open_files = max_open_files
+        self.keys = {}
+        self.node_files = {}
+        self.relationship_files = {}
+        self.rows = {}
+        self._open = OrderedDict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+    def _writer(self, stem, header):
+        if stem in self._open:
+            self._open.move_to_end(stem)
+            return self._open[stem][1]
+        if stem not in self.rows:
+            with open(self.out_dir / f"{stem}.header.csv", 'w', newline='') as f:
+                csv.writer(f).writerow(header)
+            self.rows[stem] = 0
+        if len(self._open) >= self.max_open_files:
+            _, (f, _) = self._open.popitem(last=False)
+            f.close()
+        f = open(self.out_dir / f"{stem}.csv", 'a', newline='')
+        self._open[stem] = (f, csv.writer(f))
+        return self._open[stem][1]
+
+    def add(self, element):
+        if element[0] == 'node':
+            self.add_node(*element[1:])
+        else:
+            self.add_edge(*element[1:])
+
+    def add_node(self, node_id, attributes):
+        label = attributes['label']
+        key, value = node_key(node_id, attributes)
+        group = key_group(label)
+        self.keys[node_id] = (group, value)
+
+        properties = node_properties(attributes)
+        properties.pop(key, None)
+        columns = tuple(sorted((_k, csv_type(_v)) for _k, _v in properties.items()))
+        signature = (label, columns)
+        stem = self.node_files.get(signature)
+        if stem is None:
+            stem = self.node_files[signature] = f"nodes_{len(self.node_files):04d}_{label}"
+        header = [f"{key}:ID({group})"]
+        header += [_k if _t == 'string' else f"{_k}:{_t}" for _k, _t in columns]
+        header.append(':LABEL')
+
+        labels = label if label in SCHEMA_LABELS else f"{label}{ARRAY_DELIMITER}{SECTION_LABEL}"
+        self._writer(stem, header).writerow(
+            [value] + [csv_value(properties[_k]) for _k, _ in columns] + [labels])
+        self.rows[stem] += 1
+
+    def add_edge(self, source, target, attributes):
+        relationship = attributes.get('relationship')
+        if not relationship:
+            return
+        relationship = relationship.upper()
+        source_group, source_value = self.keys[source]
+        target_group, target_value = self.keys[target]
+        signature = (relationship, source_group, target_group)
+        stem = self.relationship_files.get(signature)
+        if stem is None:
+            stem = self.relationship_files[signature] = (
+                f"relationships_{len(self.relationship_files):04d}_{relationship}")
+        header = [f":START_ID({source_group})", f":END_ID({target_group})", ':TYPE']
+        self._writer(stem, header).writerow([source_value, target_value, relationship])
+        self.rows[stem] += 1
+
+    def close(self):
+        while self._open:
+            _, (f, _) = self._open.popitem()
+            f.close()
+
+    def import_command(self, database='neo4j'):
+        """ ``neo4j-admin database import full`` command line for the exported files. """
+        command = [
+            'neo4j-admin', 'database', 'import', 'full',
+            '--multiline-fields=true', f'--array-delimiter={ARRAY_DELIMITER}'
+        ]
+        for option, stems in (('--nodes', self.node_files.values()),
+                              ('--relationships', self.relationship_files.values())):
+            for stem in stems:
+                command.append(f"{option}={self.out_dir / stem}.header.csv,{self.out_dir / stem}.csv")
+        command.append(database)
+        return ' '.join(shlex.quote(str(_c)) for _c in command)
+
+    def write_import_script(self, database='neo4j'):
+        script = self.out_dir / 'import.sh'
+        with open(script, 'w') as f:
+            f.write('#!/bin/sh\n' + self.import_command(database=database) + '\n')
+        script.chmod(0o755)
+        return script
+
+
+def export_tree_csv(ft, out_dir, database='neo4j'):
+    """ Export one FileTree's graph; returns the exporter with its file and row counts. """
+    with CsvGraphExporter(out_dir) as exporter:
+        for element in ft.iter_graph():
+            exporter.add(element)
+    print(f"Import script written to {exporter.write_import_script(database=database)}")
+    return exporter
+
+
+def export_forest_csv(base_path, out_dir, checkpoint_fstr='.labdataranger.pkl', database='neo4j'):
+    """ Export every surveyed tree below ``base_path`` into one set of import files. """
+    with CsvGraphExporter(out_dir) as exporter:
+        for dir_name, base_dir in get_base_dirs(base_path).items():
+            checkpoint = Path(base_dir).joinpath(checkpoint_fstr)
+            if not checkpoint.exists():
+                print(f"WARNING: No checkpoint for {dir_name} at {checkpoint}")
+                continue
+            for element in FileTree(base_dir, checkpoint_file=checkpoint).iter_graph():
+                exporter.add(element)
+            # Trees don't share nodes, so their keys are no longer needed
+            exporter.keys.clear()
+    print(f"Import script written to {exporter.write_import_script(database=database)}")
+    return exporter
@@ -1,33 +1,58 @@
 import json
 import neo4j
+import pandas as pd
+from pathlib import Path
+from .driver import get_driver, driver_uri
+from .driver import get_db_config  # noqa: F401 (it used to live here; re-exported for existing callers)
+from .cache import default_cache
 
 
-def get_db_config(config_file='db_config.json'):
-    with open(config_file, 'r') as file:
-        config = json.load(file)
-    for _i in ['uri', 'port', 'username', 'password']:
-        if not config.get(_i, False):
-            print(f"WARNING: '{_i}' not found in {config_file}.")
-    return config
+def cypher_name(name):
+    """ Backtick-quote a label, relationship type or property name for Cypher. """
+    return '`' + str(name).replace('`', '``') + '`'
 
 
-def dataframe(query, config_file='db_config.json', database='neo4j', column_map=None, verbose=False):
-    config = get_db_config(config_file=config_file)
-    _df = None
-    with neo4j.GraphDatabase.driver(config['uri'],
-                                    auth=(config['username'],
-                                          config['password'])) as driver:
+def _cache_uri(driver):
+    """ Server a driver talks to, for cache keys; drivers not from get_driver are told apart by object. """
+    return driver_uri(driver) or f"{type(driver).__name__}@{id(driver):x}"
+
+
+def dataframe(query, config_file='db_config.json', database='neo4j', column_map=None, verbose=False,
+              driver=None, cache=None, parameters=None):
+    """ Run ``query`` and return the result as a DataFrame.
+
+    Values belong in ``parameters`` (``$name`` in the query) rather than in
+    the query text, so Neo4j can reuse the query plan. ``cache`` is a
+    QueryCache, or True for the process-wide default cache; a cached result
+    is returned without contacting the database. Cached results are kept
+    apart per server URI; with a driver not made by get_driver they are
+    kept per driver object instead.
+    """
+    if cache is True:
+        cache = default_cache()
+    elif cache is False:
+        cache = None
+    if driver is None:
+        driver = get_driver(config_file=config_file)
+    uri = _cache_uri(driver) if cache is not None else None
+    _df = cache.get(query, parameters, database, uri) if cache is not None else None
+
+    if _df is None:
         if database:
             _df = driver.execute_query(
                 query, 
+                parameters_=parameters,
                 database_=database,
                 result_transformer_=neo4j.Result.to_df
             )
         else:
             _df = driver.execute_query(
                 query, 
+                parameters_=parameters,
                 result_transformer_=neo4j.Result.to_df
             )
+        if cache is not None:
+            cache.set(query, _df, parameters, database, uri)
 
     _df.title = f"Results for query: {query[:100]}{'...' if len(query) > 100 else ''}"
 
@@ -39,6 +64,167 @@ def dataframe(query, config_file='db_config.json', database='neo4j', column_map=
         
     return _df
     
+def _chunk_frame(rows, columns, column_map=None):
+    _df = pd.DataFrame(rows, columns=columns)
+    if column_map:
+        _df.rename(columns=column_map, inplace=True)
+    return _df
+
+
+def dataframe_chunks(query, config_file='db_config.json', database='neo4j', column_map=None,
+                     chunk_size=10000, fetch_size=1000, driver=None, parameters=None):
+    """ Yield the result of ``query`` as DataFrames of at most ``chunk_size`` rows.
+
+    Records are pulled from the server ``fetch_size`` at a time while the
+    chunks are consumed, so memory stays bounded by the chunk size however
+    large the result is. At least one (possibly empty) chunk is yielded.
+    """
+    if driver is None:
+        driver = get_driver(config_file=config_file)
+    session_options = {'fetch_size': fetch_size}
+    if database:
+        session_options['database'] = database
+
+    with driver.session(**session_options) as session:
+        result = session.run(query, parameters)
+        columns = list(result.keys())
+        rows = []
+        yielded = False
+        for record in result:
+            rows.append(record.values())
+            if len(rows) >= chunk_size:
+                yield _chunk_frame(rows, columns, column_map)
+                rows = []
+                yielded = True
+        if rows or not yielded:
+            yield _chunk_frame(rows, columns, column_map)
+
+
+def _plain_value(value):
+    """ JSON text for nodes, relationships, paths and containers, which CSV/Parquet can't hold. """
+    if isinstance(value, (neo4j.graph.Node, neo4j.graph.Relationship)):
+        return json.dumps(dict(value), default=str)
+    if isinstance(value, neo4j.graph.Path):
+        return json.dumps([dict(_n) for _n in value.nodes], default=str)
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def export_query(query, file_name, config_file='db_config.json', database='neo4j', column_map=None,
+                 chunk_size=10000, fetch_size=1000, driver=None, file_format=None, parameters=None):
+    """ Stream the result of ``query`` into a CSV or Parquet file, one chunk at a time.
+
+    The format follows the file suffix unless ``file_format`` ('csv' or
+    'parquet') is given. Parquet needs pyarrow and takes its schema from the
+    first chunk. Graph entities and containers are written as JSON text.
+    Returns the number of rows written.
+    """
+    file_name = Path(file_name)
+    file_format = (file_format or file_name.suffix.lstrip('.')).lower()
+    if file_format not in ('csv', 'parquet'):
+        raise ValueError(f"Unsupported export format '{file_format}', use 'csv' or 'parquet'")
+    if file_format == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow")
+
+    chunks = dataframe_chunks(query, config_file=config_file, database=database, column_map=column_map,
+                              chunk_size=chunk_size, fetch_size=fetch_size, driver=driver,
+                              parameters=parameters)
+    rows = 0
+    writer = None
+    try:
+        for i, chunk in enumerate(chunks):
+            chunk = chunk.apply(lambda _c: _c.map(_plain_value)) if len(chunk) else chunk
+            if file_format == 'csv':
+                chunk.to_csv(file_name, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+            else:
+                if writer is None:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(file_name, table.schema)
+                else:
+                    table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    print(f"Exported {rows} rows to {file_name}.")
+    return rows
+
+
+class NamedQuery:
+    """
+    A registered Cypher query whose values are passed as parameters.
+
+    Labels and relationship types can't be parameters, so they are written as
+    ``{name}`` placeholders listed in ``labels`` and filled in backtick-quoted;
+    everything else uses ``$name`` parameters.
+    """
+
+    def __init__(self, name, cypher, labels=(), description=''):
+        self.name = name
+        self.cypher = cypher
+        self.labels = tuple(labels)
+        self.description = description
+
+    def text(self, labels=None):
+        labels = labels or {}
+        missing = set(self.labels) - set(labels)
+        if missing:
+            raise ValueError(f"Query '{self.name}' needs labels: {', '.join(sorted(missing))}")
+        cypher = self.cypher
+        for _k in self.labels:
+            cypher = cypher.replace(f"{{{_k}}}", cypher_name(labels[_k]))
+        return cypher
+
+
+QUERIES = {}
+
+
+def register_query(name, cypher, labels=(), description=''):
+    """ Add a named query to QUERIES (replacing one of the same name) and return it. """
+    QUERIES[name] = NamedQuery(name, cypher, labels=labels, description=description)
+    return QUERIES[name]
+
+
+def run_query(name, parameters=None, labels=None, **kwargs):
+    """ Run a registered query by name; other arguments are passed to ``dataframe``. """
+    try:
+        named_query = QUERIES[name]
+    except KeyError:
+        raise KeyError(f"No query registered as '{name}'; known queries: {', '.join(sorted(QUERIES))}")
+    return dataframe(named_query.text(labels), parameters=parameters, **kwargs)
+
+
+register_query(
+    'properties_by_label',
+    "MATCH (n:{label}) RETURN properties(n) AS properties",
+    labels=('label',),
+    description="Properties of every node with a label."
+)
+register_query(
+    'label_counts',
+    "MATCH (n) UNWIND labels(n) AS label RETURN label, count(*) AS count ORDER BY count DESC",
+    description="Number of nodes per label."
+)
+register_query(
+    'files_under_path',
+    "MATCH (f:File) WHERE f.filepath STARTS WITH $path "
+    "RETURN f.filepath AS filepath, f.type AS type, f.size AS size",
+    description="Files whose filepath starts with $path."
+)
+register_query(
+    'scan_sections',
+    "MATCH (s:Scan {filepath: $path})-[:INVOLVED]->(m:Section) "
+    "RETURN [l IN labels(m) WHERE l <> 'Section'][0] AS section, properties(m) AS properties",
+    description="Metadata sections of the scan stored in folder $path."
+)
+
+
 def print_dataframe(query_result):
     print(query_result.title)
     print(query_result)    
\ No newline at end of file
@@ -1,10 +1,20 @@
+import os
+import time
+import queue
 import logging
+import functools
+import threading
+import multiprocessing
+import concurrent.futures
+import neo4j
+import pandas as pd
 from tqdm import tqdm
 from pathlib import Path
-from neomodel import db, config
-from .query import get_db_config
-from labdataranger.disk.filetree.survey import format_property_key, get_base_dirs, FileTree
-from .model import build_classes
+from neomodel import config
+from .driver import get_db_config, get_driver
+from .cache import invalidate_caches
+from .query import cypher_name
+from labdataranger.disk.filetree.survey import get_base_dirs, FileTree
 
 
 def neomodel_db_config(config_file='db_config.json', database=None):
@@ -23,111 +33,620 @@ def neomodel_db_config(config_file='db_config.json', database=None):
         print(f"ERROR: Database config failed with Exception {e}")
 
 
-def push_to_neo4j(nx_graph, class_map, log_file='push.out'):
+SCHEMA_LABELS = ('Folder', 'File', 'Scan')
+SECTION_LABEL = 'Section'
+DEFAULT_BATCH_SIZE = 5000
 
+
+def node_key(node, data):
+    """ (property, value) a graph node is MERGEd on.
+
+    Folder, File and Scan nodes are keyed by their filepath; metadata sections
+    have no natural key and use the networkx node id as ``sectionId``.
+    """
+    if data['label'] in SCHEMA_LABELS:
+        return 'filepath', str(data['filepath'])
+    return 'sectionId', str(node)
+
+
+def key_group(label):
+    """ Folder, File or Scan, or Section for every metadata section label. """
+    return label if label in SCHEMA_LABELS else SECTION_LABEL
+
+
+def node_properties(data):
+    """ Properties of a graph node that Neo4j can store. """
+    properties = {}
+    for _k, _v in data.items():
+        if _k in ('label', 'relationship') or _v is None or isinstance(_v, dict):
+            continue
+        if isinstance(_v, (list, tuple)):
+            _v = [_i if isinstance(_i, (bool, int, float, str)) else str(_i) for _i in _v]
+        elif not isinstance(_v, (bool, int, float, str)):
+            _v = str(_v)
+        properties[_k] = _v
+    return properties
+
+
+def node_query(label, key):
+    # Re-pushing an unchanged node matches it and writes nothing. A changed
+    # node gets exactly row.props (plus its key), so dropped properties go too.
+    query = (
+        "UNWIND $rows AS row\n"
+        f"MERGE (n:{cypher_name(label)} {{{cypher_name(key)}: row.key}})\n"
+    )
+    if label not in SCHEMA_LABELS:
+        query += f"ON CREATE SET n:{cypher_name(SECTION_LABEL)}\n"
+    return query + (
+        "WITH n, row\n"
+        "WHERE any(k IN keys(row.props) WHERE n[k] IS NULL OR n[k] <> row.props[k])\n"
+        f"   OR any(k IN keys(n) WHERE k <> '{key}' AND NOT k IN keys(row.props))\n"
+        f"SET n = row.props, n.{cypher_name(key)} = row.key"
+    )
+
+
+def edge_query(source_label, source_key, relationship, target_label, target_key):
+    return (
+        "UNWIND $rows AS row\n"
+        f"MERGE (a:{cypher_name(source_label)} {{{cypher_name(source_key)}: row.source}})\n"
+        f"MERGE (b:{cypher_name(target_label)} {{{cypher_name(target_key)}: row.target}})\n"
+        f"MERGE (a)-[:{cypher_name(relationship.upper())}]->(b)"
+    )
+
+
+def _chunks(rows, batch_size):
+    for _i in range(0, len(rows), batch_size):
+        yield rows[_i:_i + batch_size]
+
+
+def graph_batches(nx_graph, batch_size=DEFAULT_BATCH_SIZE, nodes=None, edges=None):
+    """ Yield ``(query, rows)`` UNWIND batches that write ``nx_graph``.
+
+    Nodes are grouped by label and edges by (source label, relationship,
+    target label), so every batch runs one parameterized query. All node
+    batches come before the edge batches; edge queries MERGE their endpoints
+    on the same keys as the node queries, so batches may also be written out
+    of order or concurrently. ``nodes`` and ``edges`` restrict the batches to
+    those node ids and (source, target) pairs.
+    """
+    keys = {}
+    for node, data in nx_graph.nodes(data=True):
+        keys[node] = (data['label'],) + node_key(node, data)
+
+    node_rows = {}
+    for node in (nx_graph.nodes if nodes is None else nodes):
+        label, key, value = keys[node]
+        node_rows.setdefault((label, key), []).append({
+            'key': value,
+            'props': node_properties(nx_graph.nodes[node])
+        })
+
+    edge_rows = {}
+    for source, target in (nx_graph.edges if edges is None else edges):
+        relationship = nx_graph.edges[source, target].get('relationship')
+        if not relationship:
+            logging.warning(f"Edge {source} -> {target} has no relationship type")
+            continue
+        source_label, source_key, source_value = keys[source]
+        target_label, target_key, target_value = keys[target]
+        edge_rows.setdefault(
+            (source_label, source_key, relationship, target_label, target_key), []
+        ).append({'source': source_value, 'target': target_value})
+
+    for (label, key), rows in node_rows.items():
+        query = node_query(label, key)
+        for batch in _chunks(rows, batch_size):
+            yield query, batch
+    for group, rows in edge_rows.items():
+        query = edge_query(*group)
+        for batch in _chunks(rows, batch_size):
+            yield query, batch
+
+
+def _run_batch(tx, query, rows):
+    tx.run(query, rows=rows).consume()
+
+
+# Per key group: query for the keys already stored below a tree root, and the
+# query deleting stale ones. Sections and Scans are found through the Folder
+# they are stored in. Stale keys are deleted in this order.
+PRUNE_QUERIES = {
+    'Section': (
+        "MATCH (f:Folder)<-[:STORED_IN]-(:Scan)-[:INVOLVED]->(n:Section)\n"
+        "WHERE f.filepath = $base OR f.filepath STARTS WITH $prefix\n"
+        "RETURN DISTINCT n.sectionId AS key",
+        "UNWIND $keys AS key\n"
+        "MATCH (n:Section {sectionId: key})\n"
+        "DETACH DELETE n"
+    ),
+    'Scan': (
+        "MATCH (f:Folder)<-[:STORED_IN]-(n:Scan)\n"
+        "WHERE f.filepath = $base OR f.filepath STARTS WITH $prefix\n"
+        "RETURN DISTINCT n.filepath AS key",
+        "UNWIND $keys AS key\n"
+        "MATCH (n:Scan {filepath: key})\n"
+        "DETACH DELETE n"
+    ),
+    'File': (
+        "MATCH (n:File)\n"
+        "WHERE n.filepath STARTS WITH $prefix\n"
+        "RETURN n.filepath AS key",
+        "UNWIND $keys AS key\n"
+        "MATCH (n:File {filepath: key})\n"
+        "DETACH DELETE n"
+    ),
+    'Folder': (
+        "MATCH (n:Folder)\n"
+        "WHERE n.filepath = $base OR n.filepath STARTS WITH $prefix\n"
+        "RETURN n.filepath AS key",
+        "UNWIND $keys AS key\n"
+        "MATCH (n:Folder {filepath: key})\n"
+        "DETACH DELETE n"
+    ),
+}
+
+
+def graph_keys(nx_graph):
+    """ Node keys of ``nx_graph`` by PRUNE_QUERIES group, plus the filepaths of its root folders. """
+    keys = {_k: set() for _k in PRUNE_QUERIES}
+    keys['roots'] = []
+    for node, data in nx_graph.nodes(data=True):
+        _, value = node_key(node, data)
+        label = data['label']
+        keys[key_group(label)].add(value)
+        # Scans in a folder point at it with stored_in, so only folder parents count
+        if label == 'Folder' and not any(
+                _d.get('relationship') == 'contains_folder' for _, _, _d in nx_graph.in_edges(node, data=True)):
+            keys['roots'].append(value)
+    return keys
+
+
+def _read_keys(tx, query, parameters):
+    return [_r['key'] for _r in tx.run(query, **parameters)]
+
+
+def _delete_keys(tx, query, keys):
+    tx.run(query, keys=keys).consume()
+
+
+def prune_session(session, keys, batch_size=DEFAULT_BATCH_SIZE):
+    """ Delete nodes stored below the roots in ``keys`` (see graph_keys) that are no longer in it.
+
+    All stored keys are read before anything is deleted; returns the number
+    of deleted nodes.
+    """
+    stale = {_k: set() for _k in PRUNE_QUERIES}
+    for root in keys['roots']:
+        parameters = {'base': root, 'prefix': root.rstrip(os.sep) + os.sep}
+        for group, (read_query, _) in PRUNE_QUERIES.items():
+            stored = session.execute_read(_read_keys, read_query, parameters)
+            stale[group].update(set(stored) - keys[group])
+
+    deleted = 0
+    for group, (_, delete_query) in PRUNE_QUERIES.items():
+        for batch in _chunks(sorted(stale[group]), batch_size):
+            session.execute_write(_delete_keys, delete_query, batch)
+            deleted += len(batch)
+    if deleted:
+        logging.info(f"Pruned {deleted} stale nodes below {', '.join(keys['roots'])}")
+    return deleted
+
+
+SCHEMA_TIMEOUT = 300
+
+
+def section_labels(nx_graph):
+    """ Metadata section labels used in ``nx_graph``. """
+    return sorted({_d['label'] for _, _d in nx_graph.nodes(data=True)} - set(SCHEMA_LABELS))
+
+
+def schema_statements(section_labels=()):
+    """ Constraints and indexes backing the MERGE keys and filepath lookups.
+
+    Uniqueness constraints on Folder/File/Scan ``filepath`` and Section
+    ``sectionId`` (each also creates a range index), text indexes for
+    filepath string searches, and a range index on ``sectionId`` for every
+    section label, since section nodes are MERGEd under that label.
+    """
+    statements = [
+        f"CREATE CONSTRAINT {cypher_name(f'{_l}_filepath_unique')} IF NOT EXISTS "
+        f"FOR (n:{cypher_name(_l)}) REQUIRE n.filepath IS UNIQUE"
+        for _l in SCHEMA_LABELS
+    ]
+    statements.append(
+        f"CREATE CONSTRAINT {cypher_name(f'{SECTION_LABEL}_sectionId_unique')} IF NOT EXISTS "
+        f"FOR (n:{cypher_name(SECTION_LABEL)}) REQUIRE n.sectionId IS UNIQUE"
+    )
+    statements += [
+        f"CREATE TEXT INDEX {cypher_name(f'{_l}_filepath_text')} IF NOT EXISTS "
+        f"FOR (n:{cypher_name(_l)}) ON (n.filepath)"
+        for _l in ('Folder', 'File')
+    ]
+    statements += [
+        f"CREATE RANGE INDEX {cypher_name(f'{_l}_sectionId')} IF NOT EXISTS "
+        f"FOR (n:{cypher_name(_l)}) ON (n.sectionId)"
+        for _l in section_labels if _l != SECTION_LABEL
+    ]
+    return statements
+
+
+def ensure_schema(driver, database=None, section_labels=(), timeout=SCHEMA_TIMEOUT):
+    """ Create the constraints and indexes the loaders rely on and wait until they are online.
+
+    Safe to run before every load. A conflicting index that already covers a
+    property (e.g. one created by neomodel's ``install_labels``) is kept.
+    """
+    with driver.session(database=database) as session:
+        for statement in schema_statements(section_labels):
+            try:
+                session.run(statement).consume()
+            except neo4j.exceptions.ClientError as e:
+                if 'AlreadyExists' not in (e.code or ''):
+                    raise
+                logging.info(f"Kept existing schema rule instead of '{statement}': {e.message}")
+        session.run("CALL db.awaitIndexes($timeout)", timeout=timeout).consume()
+
+
+def _provision_schema(driver, database=None, section_labels=()):
+    # A missing privilege should not stop a load, it only makes it slower
+    try:
+        ensure_schema(driver, database=database, section_labels=section_labels)
+    except neo4j.exceptions.Neo4jError as e:
+        logging.warning(f"Schema provisioning failed, loading without it: {e}")
+        print(f"WARNING: Schema provisioning failed, loading without it: {e}")
+
+
+def write_session_batches(session, batches):
+    """ Write ``(query, rows)`` batches in an open session, one transaction each.
+
+    Returns (rows written, rows failed); failed batches are logged and skipped.
+    """
+    written, failed = 0, 0
+    for query, rows in batches:
+        try:
+            session.execute_write(_run_batch, query, rows)
+            written += len(rows)
+        except neo4j.exceptions.Neo4jError as e:
+            failed += len(rows)
+            logging.error(f"Error writing {len(rows)} rows with query {query!r}: {e}")
+    return written, failed
+
+
+def write_batches(driver, batches, database=None, desc="Batches"):
+    """ Write ``(query, rows)`` batches in a new session; returns (rows written, rows failed). """
+    with driver.session(database=database) as session:
+        return write_session_batches(session, tqdm(batches, desc=desc))
+
+
+def push_to_neo4j(nx_graph, class_map=None, log_file='push.out', driver=None, database=None,
+                  config_file='db_config.json', batch_size=DEFAULT_BATCH_SIZE, prune=False,
+                  provision_schema=True):
+    """ Write a FileTree graph to Neo4j with batched ``UNWIND ... MERGE`` queries.
+
+    Nodes are MERGEd on their key (see ``node_key``), so pushing the same tree
+    again is an upsert that only touches changed properties. Each batch of
+    ``batch_size`` rows is committed in its own transaction. With ``prune``,
+    nodes below the tree's root folder that are no longer in the graph are
+    deleted afterwards. Unless ``provision_schema`` is False, the constraints
+    and indexes from ``ensure_schema`` are created first so every MERGE is
+    index-backed. ``driver`` defaults to the shared one for ``config_file``.
+    ``class_map`` is no longer needed and only kept for existing callers.
+    """
     logging.basicConfig(filename=log_file, level=logging.ERROR, format='%(asctime)s %(message)s')
 
-    node_map = {}
-    with db.transaction:
-        for node, data in tqdm(nx_graph.nodes(data=True), desc="Nodes"):
-            label = data['label']
-            properties = {
-                k: v
-                for k, v in data.items() if k not in ['label', 'relationship']
-            }
-
-            NodeClass = class_map.get(label, None)
-            if NodeClass:
-                try:
-                    node_instance = NodeClass(**properties).save()
-                    node_map[node] = node_instance
-                except Exception as e:
-                    error_message = f"Error saving node {node} of type {label}: {e}"
-                    logging.error(error_message)
-            else:
-                label_mod = format_property_key(label)
-                NodeClass = class_map.get(label_mod, None)
-                if NodeClass:
-                    try:
-                        node_instance = NodeClass(**properties).save()
-                        node_map[node] = node_instance
-                    except Exception as e:
-                        error_message = f"Error saving node {node} of type {label_mod}: {e}"
-                        logging.error(error_message)
-                else:
-                    warning_message = f"WARNING: Node {node} has no label match:\n{data}"
-                    logging.warning(warning_message)
-
-        for source, target, data in tqdm(nx_graph.edges(data=True), desc="Edges"):
-            relationship_type = data.get('relationship')
-            source_node = node_map.get(source)
-            target_node = node_map.get(target)
-
-            if source_node and target_node and relationship_type:
-                source_type = nx_graph.nodes[source]['label']
-                source_type_camel_case = format_property_key(source_type)
-                relationship = getattr(class_map[source_type], relationship_type, None)
-                if not relationship:
-                    print("Source:", source_node)
-                    print("Target:", target_node)
-                    print("Source Type:", source_type)
-                    print("Relationship Type", relationship_type)
-                    relationship = getattr(class_map[source_type_camel_case], relationship_type, None)
-                if relationship:
-                    try:
-                        getattr(source_node, relationship_type).connect(target_node)
-                    except ValueError as ve:
-                        error_message = f"Error connecting {source_node} to {target_node}: {ve}"
-                        logging.error(error_message)
-                    except Exception as e:
-                        error_message = f"Unexpected error connecting {source_node} to {target_node}: {e}"
-                        logging.error(error_message)
-                else:
-                    warning_message = f"Relationship type '{relationship_type}' not found between {source} and {target}"
-                    logging.warning(warning_message)
+    if driver is None:
+        driver = get_driver(config_file=config_file)
+    deleted = 0
+    if provision_schema:
+        _provision_schema(driver, database=database, section_labels=section_labels(nx_graph))
+    try:
+        written, failed = write_batches(driver, graph_batches(nx_graph, batch_size), database=database)
+        if prune:
+            with driver.session(database=database) as session:
+                deleted = prune_session(session, graph_keys(nx_graph), batch_size=batch_size)
+    finally:
+        invalidate_caches(database)
+
+    print(f"Graph loading complete! {written} rows written, {failed} failed, {deleted} nodes pruned.")
+    return {
+        'nodes': nx_graph.number_of_nodes(),
+        'relationships': nx_graph.number_of_edges(),
+        'written': written,
+        'failed': failed,
+        'deleted': deleted
+    }
+
 
-    print("Graph loading complete!")
-    return node_map
+def load_tree_graph(base_dir, checkpoint_fstr='.labdataranger.pkl'):
+    """ The graph of a surveyed tree, from its checkpoint. """
+    base_dir = Path(base_dir)
+    checkpoint = base_dir.joinpath(checkpoint_fstr)
+    if not checkpoint.exists():
+        raise FileNotFoundError(f"No checkpoint at {checkpoint}")
+    return FileTree(base_dir, checkpoint_file=checkpoint).graph
 
 
-def push_tree_to_db(base_path, checkpoint_fstr='.labdataranger.pkl'):
+def load_tree_batches(base_dir, checkpoint_fstr='.labdataranger.pkl', batch_size=DEFAULT_BATCH_SIZE, prune=False):
+    """ Load a surveyed tree's checkpoint.
+
+    Returns (nodes, relationships, batches, section labels, keys); ``batches``
+    is a generator over the loaded graph and ``keys`` (see graph_keys) is only
+    collected when ``prune`` is set.
+    """
+    graph = load_tree_graph(base_dir, checkpoint_fstr)
+    return (
+        graph.number_of_nodes(),
+        graph.number_of_edges(),
+        graph_batches(graph, batch_size),
+        section_labels(graph),
+        graph_keys(graph) if prune else None
+    )
+
+
+def stream_tree_batches(tree_id, base_dir, batches, nodes_written,
+                        checkpoint_fstr='.labdataranger.pkl', batch_size=DEFAULT_BATCH_SIZE, prune=False):
+    """ Loader for push_forest_to_db: stream one tree's batches into the ``batches`` queue.
+
+    Puts ``('tree', id, nodes, relationships, section labels, load seconds)``,
+    then ``('node', id, query, rows)`` batches and ``('nodes_queued', id)``.
+    It then waits for the ``nodes_written`` event before putting the
+    ``('edge', id, query, rows)`` batches, so a tree's relationships are only
+    MERGEd once all of its nodes exist. Finishes with ``('done', id, keys)``,
+    or ``('error', id, message)`` if anything fails.
+    """
+    try:
+        start = time.perf_counter()
+        graph = load_tree_graph(base_dir, checkpoint_fstr)
+        keys = graph_keys(graph) if prune else None
+        batches.put((
+            'tree', tree_id, graph.number_of_nodes(), graph.number_of_edges(),
+            section_labels(graph), time.perf_counter() - start
+        ))
+        for query, rows in graph_batches(graph, batch_size, edges=()):
+            batches.put(('node', tree_id, query, rows))
+        batches.put(('nodes_queued', tree_id))
+        nodes_written.wait()
+        for query, rows in graph_batches(graph, batch_size, nodes=()):
+            batches.put(('edge', tree_id, query, rows))
+        batches.put(('done', tree_id, keys))
+    except Exception as e:
+        batches.put(('error', tree_id, repr(e)))
+
+
+def _tree_report(name, base_dir):
+    return {
+        'name': name,
+        'base': str(base_dir),
+        'nodes': 0,
+        'relationships': 0,
+        'written': 0,
+        'failed': 0,
+        'deleted': 0,
+        'load_seconds': None,
+        'push_seconds': None,
+        'error': None
+    }
+
+
+def push_tree_to_db(base_path, checkpoint_fstr='.labdataranger.pkl', driver=None, database=None,
+                    config_file='db_config.json', batch_size=DEFAULT_BATCH_SIZE, prune=False,
+                    provision_schema=True, log_file='push.out'):
+    """ Push one surveyed tree; returns a report dict (see push_forest_to_db). """
+    logging.basicConfig(filename=log_file, level=logging.ERROR, format='%(asctime)s %(message)s')
     base_path = Path(base_path)
     print(base_path)
-    ft = FileTree(
-        base_path, 
-        checkpoint_file=base_path.joinpath(checkpoint_fstr)
-    )    
-    class_map, class_dict = build_classes(ft.graph)
+    report = _tree_report(base_path.name, base_path)
+
     try:
-        node_map = push_to_neo4j(ft.graph, class_map)
-    except: 
-        print(f"ERROR: {base_path.name} filetree could not be loaded")
+        start = time.perf_counter()
+        report['nodes'], report['relationships'], batches, labels, keys = load_tree_batches(
+            base_path, checkpoint_fstr=checkpoint_fstr, batch_size=batch_size, prune=prune)
+        report['load_seconds'] = time.perf_counter() - start
+
+        if driver is None:
+            driver = get_driver(config_file=config_file)
+        start = time.perf_counter()
+        if provision_schema:
+            _provision_schema(driver, database=database, section_labels=labels)
+        report['written'], report['failed'] = write_batches(driver, batches, database=database)
+        if prune:
+            with driver.session(database=database) as session:
+                report['deleted'] = prune_session(session, keys, batch_size=batch_size)
+        report['push_seconds'] = time.perf_counter() - start
+    except Exception as e:
+        report['error'] = repr(e)
+        logging.error(f"{base_path.name} filetree could not be pushed: {e}")
+        print(f"ERROR: {base_path.name} filetree could not be pushed: {e}")
+    finally:
+        invalidate_caches(database)
+    return report
 
 
-def push_forest_to_db(base_path, 
-                      checkpoint_fstr='.labdataranger.pkl'):
-    
-    for dir_name, base_dir in get_base_dirs(base_path).items():
-        push_tree_to_db(base_dir, checkpoint_fstr=checkpoint_fstr)
-        # ft = FileTree(base_dir, checkpoint_file=checkpoint)    
-        # class_map, class_dict = build_classes(ft.graph)
-        # try:
-        #     node_map = push_to_neo4j(ft.graph, class_map)
-        # except: 
-        #     print(f"ERROR: {dir_name} filetree could not be loaded")
+def _new_tree_state(name, base_dir, nodes_written):
+    return {
+        'report': _tree_report(name, base_dir),
+        'nodes_written': nodes_written,
+        'outstanding': {'node': 0, 'edge': 0},
+        'nodes_queued': False,
+        'released': False,
+        'done': False,
+        'finished': False,
+        'keys': None,
+        'start': None
+    }
+
+
+def _settle(state):
+    """ (release edges, finish tree) for a tree's state; call with the state lock held. """
+    release = state['nodes_queued'] and state['outstanding']['node'] == 0 and not state['released']
+    if release:
+        state['released'] = True
+    finish = state['done'] and not any(state['outstanding'].values()) and not state['finished']
+    if finish:
+        state['finished'] = True
+    return release, finish
+
 
+def push_forest_to_db(base_path,
+                      checkpoint_fstr='.labdataranger.pkl',
+                      driver=None,
+                      database=None,
+                      config_file='db_config.json',
+                      batch_size=DEFAULT_BATCH_SIZE,
+                      prune=False,
+                      provision_schema=True,
+                      load_workers=None,
+                      write_workers=4,
+                      queue_size=None,
+                      log_file='push.out'):
+    """ Push every surveyed tree below ``base_path`` to Neo4j.
+
+    Checkpoints are loaded in a process pool of ``load_workers`` that streams
+    each tree's UNWIND batches (see stream_tree_batches) through a queue
+    bounded by ``queue_size`` (default ``2 * write_workers``), so only a
+    handful of batches are in memory and the database sets the pace. The
+    ``write_workers`` threads each hold their own session and write whatever
+    batch comes next, so a single large tree is still written over every
+    connection. A tree's relationship batches are only queued once all of
+    its node batches are written. With ``prune``, each tree's stale nodes
+    are deleted after its last batch (see prune_session). The base schema is
+    provisioned once up front and each tree's section label indexes before
+    its first batch. Returns one report row per tree, totalled from the
+    batch results.
+    """
+    logging.basicConfig(filename=log_file, level=logging.ERROR, format='%(asctime)s %(message)s')
+
+    if driver is None:
+        driver = get_driver(config_file=config_file)
+    if provision_schema:
+        _provision_schema(driver, database=database)
+    provisioned = set()
+
+    base_dirs = get_base_dirs(base_path)
+    queue_size = queue_size or 2 * write_workers
+    writes = queue.Queue(maxsize=queue_size)
+    trees = {}
+    lock = threading.Lock()
+    reports = []
+    progress = tqdm(total=len(base_dirs), desc="Trees")
+
+    def finish(state):
+        report = state['report']
+        if state['keys'] is not None and report['error'] is None:
+            try:
+                with driver.session(database=database) as session:
+                    report['deleted'] = prune_session(session, state['keys'], batch_size=batch_size)
+            except Exception as e:
+                report['error'] = repr(e)
+                logging.error(f"{report['name']} filetree could not be pruned: {e}")
+        if state['start'] is not None:
+            report['push_seconds'] = time.perf_counter() - state['start']
+        invalidate_caches(database)
+        with lock:
+            reports.append(report)
+        progress.update(1)
+
+    def update(state, change):
+        with lock:
+            change()
+            release, done = _settle(state)
+        if release:
+            state['nodes_written'].set()
+        if done:
+            finish(state)
+
+    def writer():
+        with driver.session(database=database) as session:
+            while True:
+                item = writes.get()
+                if item is None:
+                    return
+                tree_id, kind, query, rows = item
+                try:
+                    written, failed = write_session_batches(session, [(query, rows)])
+                except Exception as e:
+                    written, failed = 0, len(rows)
+                    logging.error(f"Error writing {len(rows)} rows with query {query!r}: {e}")
+                state = trees[tree_id]
+
+                def change():
+                    state['report']['written'] += written
+                    state['report']['failed'] += failed
+                    state['outstanding'][kind] -= 1
+                update(state, change)
+
+    writers = [threading.Thread(target=writer, daemon=True) for _ in range(write_workers)]
+    for thread in writers:
+        thread.start()
+
+    manager = multiprocessing.Manager()
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=load_workers)
+    try:
+        batches = manager.Queue(maxsize=queue_size)
+
+        def loader_crashed(tree_id, future):
+            # stream_tree_batches reports its own errors; this only catches a dead worker
+            if future.exception() is not None:
+                batches.put(('error', tree_id, repr(future.exception())))
+
+        for tree_id, (name, base_dir) in enumerate(base_dirs.items()):
+            trees[tree_id] = _new_tree_state(name, base_dir, manager.Event())
+            future = pool.submit(stream_tree_batches, tree_id, base_dir, batches, trees[tree_id]['nodes_written'],
+                                 checkpoint_fstr, batch_size, prune)
+            future.add_done_callback(functools.partial(loader_crashed, tree_id))
+
+        remaining = len(trees)
+        while remaining:
+            message = batches.get()
+            kind, tree_id = message[:2]
+            state = trees[tree_id]
+            report = state['report']
+            if kind == 'tree':
+                _, _, report['nodes'], report['relationships'], labels, report['load_seconds'] = message
+                labels = set(labels) - provisioned
+                if provision_schema and labels:
+                    _provision_schema(driver, database=database, section_labels=sorted(labels))
+                provisioned.update(labels)
+                state['start'] = time.perf_counter()
+            elif kind in ('node', 'edge'):
+                with lock:
+                    state['outstanding'][kind] += 1
+                writes.put((tree_id, kind, message[2], message[3]))
+            elif kind == 'nodes_queued':
+                update(state, lambda: state.update(nodes_queued=True))
+            elif not state['done']:
+                if kind == 'done':
+                    state['keys'] = message[2]
+                else:
+                    report['error'] = message[2]
+                    logging.error(f"{report['name']} filetree could not be loaded: {message[2]}")
+                remaining -= 1
+                update(state, lambda: state.update(done=True))
+    finally:
+        for _ in writers:
+            writes.put(None)
+        for thread in writers:
+            thread.join()
+        for state in trees.values():
+            state['nodes_written'].set()
+        pool.shutdown(wait=False, cancel_futures=True)
+        manager.shutdown()
+        progress.close()
+
+    report = pd.DataFrame(reports, columns=list(_tree_report(None, None)))
+    failed = report['error'].notna() | (report['failed'] > 0)
+    print(f"Pushed {len(report) - failed.sum()} of {len(report)} trees "
+          f"({report['written'].sum()} rows written).")
+    for _, row in report[failed].iterrows():
+        print(f"  ERROR: {row['name']}: {row['error'] if pd.notna(row['error']) else str(row['failed']) + ' rows failed'}")
+    return report
 
 
 def create_and_connect_folders(parent_folder_path, 
                                database=None,
                                config_file='db_config.json'):
 
-    db_config = get_db_config(config_file=config_file)
-    uri = f"{db_config['uri']}:{db_config['port']}"
-    username = db_config['username']
-    password = db_config['password']
-    
-    driver = GraphDatabase.driver(uri, auth=(username, password))
+    driver = get_driver(config_file=config_file)
     parent_folder_name = os.path.basename(parent_folder_path.rstrip('/'))    
 
     query = """
@@ -153,5 +672,3 @@ def create_and_connect_folders(parent_folder_path,
             print(f"  Parent Folder: {record['parent']['filepath']}")
             print(f"      Subfolder: {record['subfolder']['filepath']}")
             print()
-            
-    driver.close()
@@ -0,0 +1,183 @@
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from .store import (
+    DEFAULT_BATCH_SIZE, PRUNE_QUERIES, cypher_name, node_key, key_group, node_properties,
+    graph_batches, write_batches, section_labels, _chunks, _delete_keys, _provision_schema
+)
+from .driver import get_driver
+from .cache import invalidate_caches
+from labdataranger.disk.filetree.survey import FileTree
+
+
+MANIFEST_VERSION = 1
+
+
+def manifest_file_name(checkpoint_file):
+    """ Sync manifest kept next to a checkpoint, e.g. ``.labdataranger.sync.json``. """
+    return Path(checkpoint_file).with_suffix('.sync.json')
+
+
+def node_hash(label, properties):
+    """ Content hash of a node's label and storable properties. """
+    payload = json.dumps([label, properties], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _edge_id(source, target):
+    return f"{source}\0{target}"
+
+
+def build_manifest(nx_graph, database=None):
+    """ Node keys and hashes plus relationships of ``nx_graph``, as stored after a sync.
+
+        nodes  node id -> [label, key property, key value, hash]
+        edges  "source<NUL>target" -> relationship
+    """
+    nodes = {}
+    for node, data in nx_graph.nodes(data=True):
+        key, value = node_key(node, data)
+        nodes[node] = [data['label'], key, value, node_hash(data['label'], node_properties(data))]
+    edges = {
+        _edge_id(_s, _t): _d.get('relationship')
+        for _s, _t, _d in nx_graph.edges(data=True)
+    }
+    return {'version': MANIFEST_VERSION, 'database': database, 'nodes': nodes, 'edges': edges}
+
+
+def load_manifest(file_name):
+    file_name = Path(file_name)
+    if not file_name.exists():
+        return None
+    with open(file_name, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(manifest, file_name):
+    file_name = Path(file_name)
+    tmp_name = file_name.with_name(file_name.name + '.tmp')
+    with open(tmp_name, 'w') as f:
+        json.dump(manifest, f)
+    tmp_name.replace(file_name)
+
+
+def diff_manifests(previous, current):
+    """ Added/changed/removed node ids and added/removed edge ids between two manifests. """
+    old_nodes = previous['nodes'] if previous else {}
+    old_edges = previous['edges'] if previous else {}
+    new_nodes, new_edges = current['nodes'], current['edges']
+    return {
+        'added': [_n for _n in new_nodes if _n not in old_nodes],
+        'changed': [_n for _n, _v in new_nodes.items() if _n in old_nodes and old_nodes[_n] != _v],
+        'removed': [_n for _n in old_nodes if _n not in new_nodes],
+        'added_edges': [_e for _e, _r in new_edges.items() if old_edges.get(_e) != _r],
+        'removed_edges': [_e for _e, _r in old_edges.items() if new_edges.get(_e) != _r],
+    }
+
+
+def _delete_edges_batches(diff, previous, batch_size):
+    """ DELETE batches for relationships that went away between still existing nodes. """
+    removed = set(diff['removed'])
+    groups = {}
+    for edge in diff['removed_edges']:
+        source, target = edge.split('\0')
+        if source in removed or target in removed:
+            # DETACH DELETE of the node takes the relationship with it
+            continue
+        source_label, source_key, source_value, _ = previous['nodes'][source]
+        target_label, target_key, target_value, _ = previous['nodes'][target]
+        groups.setdefault(
+            (source_label, source_key, previous['edges'][edge], target_label, target_key), []
+        ).append({'source': source_value, 'target': target_value})
+
+    for (source_label, source_key, relationship, target_label, target_key), rows in groups.items():
+        query = (
+            "UNWIND $rows AS row\n"
+            f"MATCH (a:{cypher_name(source_label)} {{{cypher_name(source_key)}: row.source}})"
+            f"-[r:{cypher_name(relationship.upper())}]->"
+            f"(b:{cypher_name(target_label)} {{{cypher_name(target_key)}: row.target}})\n"
+            "DELETE r"
+        )
+        for batch in _chunks(rows, batch_size):
+            yield query, batch
+
+
+def sync_graph(nx_graph, previous=None, driver=None, database=None, config_file='db_config.json',
+               batch_size=DEFAULT_BATCH_SIZE, provision_schema=True):
+    """ Push only what changed in ``nx_graph`` since the sync that wrote ``previous``.
+
+    Returns (manifest, counts). Without a usable ``previous`` manifest, or one
+    written for another database, every node and relationship is pushed.
+    """
+    if previous is not None and previous.get('database') != database:
+        previous = None
+    current = build_manifest(nx_graph, database=database)
+    diff = diff_manifests(previous, current)
+    counts = {_k: len(_v) for _k, _v in diff.items()}
+    counts.update(written=0, failed=0, deleted=0)
+
+    if driver is None:
+        driver = get_driver(config_file=config_file)
+    if provision_schema and (diff['added'] or diff['changed'] or diff['added_edges']):
+        _provision_schema(driver, database=database, section_labels=section_labels(nx_graph))
+    try:
+        edges = [tuple(_e.split('\0')) for _e in diff['added_edges']]
+        counts['written'], counts['failed'] = write_batches(
+            driver,
+            graph_batches(nx_graph, batch_size, nodes=diff['added'] + diff['changed'], edges=edges),
+            database=database
+        )
+        if previous is not None:
+            _, failed = write_batches(
+                driver, _delete_edges_batches(diff, previous, batch_size), database=database, desc="Unlink")
+            counts['failed'] += failed
+
+            removed = {}
+            for node in diff['removed']:
+                label, _, value, _ = previous['nodes'][node]
+                removed.setdefault(key_group(label), []).append(value)
+            with driver.session(database=database) as session:
+                for group, (_, delete_query) in PRUNE_QUERIES.items():
+                    for batch in _chunks(removed.get(group, []), batch_size):
+                        session.execute_write(_delete_keys, delete_query, batch)
+                        counts['deleted'] += len(batch)
+    finally:
+        invalidate_caches(database)
+    return current, counts
+
+
+def sync_tree_to_db(base_path, checkpoint_fstr='.labdataranger.pkl', driver=None, database=None,
+                    config_file='db_config.json', batch_size=DEFAULT_BATCH_SIZE, full=False,
+                    log_file='push.out'):
+    """ Sync one surveyed tree, keeping the last pushed state in a manifest next to its checkpoint.
+
+    The manifest is only updated when every batch was written, so a failed
+    sync is retried in full on the next run. ``full`` ignores the manifest.
+    """
+    logging.basicConfig(filename=log_file, level=logging.ERROR, format='%(asctime)s %(message)s')
+    base_path = Path(base_path)
+    checkpoint = base_path.joinpath(checkpoint_fstr)
+    if not checkpoint.exists():
+        raise FileNotFoundError(f"No checkpoint at {checkpoint}")
+    manifest_file = manifest_file_name(checkpoint)
+
+    start = time.perf_counter()
+    graph = FileTree(base_path, checkpoint_file=checkpoint).graph
+    previous = None if full else load_manifest(manifest_file)
+    manifest, counts = sync_graph(graph, previous, driver=driver, database=database,
+                                  config_file=config_file, batch_size=batch_size)
+    if counts['failed'] == 0:
+        save_manifest(manifest, manifest_file)
+    else:
+        logging.error(f"{base_path.name}: {counts['failed']} rows failed, manifest not updated")
+
+    counts['seconds'] = time.perf_counter() - start
+    print(f"Synced {base_path.name}: {counts['added']} added, {counts['changed']} changed, "
+          f"{counts['removed']} removed nodes; {counts['added_edges']} added, "
+          f"{counts['removed_edges']} removed relationships ({counts['seconds']:.1f} s).")
+    return counts
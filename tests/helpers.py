@@ -0,0 +1,141 @@
+"""
+Shared test fixtures: synthetic survey trees and DICOM series, and a fake
+Neo4j driver. benchmarks/bench_dicom.py keeps its own copy of the series
+builder so it runs without the tests on the path.
+"""
+import io
+import os
+import numpy as np
+import pydicom
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.uid import ExplicitVRLittleEndian, MRImageStorage, generate_uid
+from labdataranger.disk.filetree.survey import FileTree
+
+
+def make_tree(root):
+    scan = root / "project" / "scan_01"
+    scan.mkdir(parents=True)
+    (scan / "scan_01.log").write_text("[System]\nScanner=SkyScan1276\n[Acquisition]\nExposure (ms)=500\n")
+    (scan / "slice_0001.raw").write_bytes(b"x" * 10)
+    (scan / "slice_0002.raw").write_bytes(b"x" * 20)
+    (root / "readme.md").write_bytes(b"x" * 5)
+    (root / "$RECYCLE.BIN").mkdir()
+    (root / "$RECYCLE.BIN" / "junk.raw").write_bytes(b"x")
+    return root
+
+
+class FakeResult:
+    def __init__(self, records=()):
+        self.records = list(records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def consume(self):
+        return None
+
+
+class FakeTransaction:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, **parameters):
+        self.driver.queries.append((query, parameters))
+        if 'RETURN' in query:
+            for label, keys in self.driver.stored.items():
+                if f"(n:{label})" in query:
+                    return FakeResult({'key': _k} for _k in keys)
+        return FakeResult()
+
+
+class FakeSession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def run(self, query, **parameters):
+        return FakeTransaction(self.driver).run(query, **parameters)
+
+    def execute_write(self, func, *args, **kwargs):
+        self.driver.transactions += 1
+        return func(FakeTransaction(self.driver), *args, **kwargs)
+
+    execute_read = execute_write
+
+
+class FakeDriver:
+    """ Records every query a session runs instead of talking to Neo4j. """
+    def __init__(self, stored=None):
+        self.queries = []
+        self.transactions = 0
+        self.stored = stored or {}
+
+    def session(self, database=None):
+        return FakeSession(self)
+
+    def close(self):
+        pass
+
+
+def survey_graph(tmp_path):
+    ft = FileTree(make_tree(tmp_path), skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    return ft.graph
+
+
+class CountingFileIO(io.FileIO):
+    """ FileIO that counts the bytes actually read from the file. """
+
+    bytes_read = 0
+
+    def readinto(self, b):
+        n = super().readinto(b)
+        CountingFileIO.bytes_read += n or 0
+        return n
+
+
+def write_dataset(path, ds):
+    try:
+        pydicom.dcmwrite(path, ds, enforce_file_format=True)
+    except TypeError:
+        # pydicom < 3
+        ds.is_little_endian, ds.is_implicit_VR = True, False
+        pydicom.dcmwrite(path, ds, write_like_original=False)
+
+
+def make_mr_series(root, n_slices, rows=256, columns=256, csa_size=12000):
+    """ Write ``n_slices`` MR slices with a vendor-style private header into ``root``. """
+    series_uid = generate_uid()
+    pixels = np.zeros((rows, columns), dtype=np.uint16).tobytes()
+    for i in range(n_slices):
+        meta = FileMetaDataset()
+        meta.MediaStorageSOPClassUID = MRImageStorage
+        meta.MediaStorageSOPInstanceUID = generate_uid()
+        meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+        ds = Dataset()
+        ds.file_meta = meta
+        ds.SOPClassUID = MRImageStorage
+        ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+        ds.SeriesInstanceUID = series_uid
+        ds.Modality = 'MR'
+        ds.PatientName = 'Synthetic^Mouse'
+        ds.SeriesDescription = 'T2 RARE'
+        ds.InstanceNumber = i + 1
+        ds.SliceLocation = i * 0.1
+        ds.ImagePositionPatient = [0.0, 0.0, i * 0.1]
+        ds.Rows, ds.Columns = rows, columns
+        ds.SamplesPerPixel = 1
+        ds.PhotometricInterpretation = 'MONOCHROME2'
+        ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 16, 15
+        ds.PixelRepresentation = 0
+        ds.add_new(0x00290010, 'LO', 'SIEMENS CSA HEADER')
+        ds.add_new(0x00291010, 'OB', bytes(csa_size))
+        ds.PixelData = pixels
+        write_dataset(os.path.join(root, f"slice_{i + 1:05d}.dcm"), ds)
+    return root
@@ -0,0 +1,82 @@
+import asyncio
+import pandas as pd
+import pytest
+from labdataranger.graph import aio
+
+
+class SlowAsyncDriver:
+    """ Answers every query after a short delay and tracks how many ran at once. """
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.calls = []
+
+    async def execute_query(self, query, parameters_=None, database_=None, result_transformer_=None):
+        self.calls.append((query, parameters_, database_))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if 'fail' in query:
+                raise RuntimeError(query)
+            return pd.DataFrame({'query': [query], 'parameters': [parameters_]})
+        finally:
+            self.running -= 1
+
+    async def close(self):
+        pass
+
+
+def test_gather_runs_queries_concurrently_with_a_limit():
+    driver = SlowAsyncDriver()
+    queries = [f"RETURN {_i}" for _i in range(12)]
+    results = aio.dataframes(queries, driver=driver, max_concurrency=4)
+    assert [_r['query'][0] for _r in results] == queries
+    assert driver.max_running == 4
+
+
+def test_gather_keeps_dict_keys_and_parameters():
+    driver = SlowAsyncDriver(delay=0)
+    results = aio.dataframes({'a': ("RETURN $x", {'x': 1}), 'b': "RETURN 2"}, driver=driver, database='instruments')
+    assert results['a']['parameters'][0] == {'x': 1}
+    assert results['b']['query'][0] == "RETURN 2"
+    assert {_c[2] for _c in driver.calls} == {'instruments'}
+
+
+def test_failures_can_be_returned():
+    driver = SlowAsyncDriver(delay=0)
+    results = aio.dataframes(["RETURN 1", "fail"], driver=driver, return_exceptions=True)
+    assert isinstance(results[1], RuntimeError)
+    with pytest.raises(RuntimeError):
+        aio.dataframes(["fail"], driver=driver)
+
+
+class ClosingAsyncDriver(SlowAsyncDriver):
+    """ Fails queries containing 'fail' at once and notes whether it is closed mid-query. """
+    def __init__(self):
+        super().__init__(delay=0.2)
+        self.closed_while_running = False
+
+    async def execute_query(self, query, **kwargs):
+        if 'fail' in query:
+            raise RuntimeError(query)
+        return await super().execute_query(query, **kwargs)
+
+    async def close(self):
+        self.closed_while_running = self.running > 0
+
+
+def test_failure_cancels_other_queries_before_closing_the_driver(monkeypatch):
+    driver = ClosingAsyncDriver()
+    monkeypatch.setattr(aio, 'async_driver', lambda **kwargs: driver)
+    with pytest.raises(RuntimeError):
+        aio.dataframes(["RETURN 1", "RETURN 2", "fail"])
+    assert driver.running == 0
+    assert not driver.closed_while_running
+
+
+def test_properties_by_labels():
+    driver = SlowAsyncDriver(delay=0)
+    results = asyncio.run(aio.properties_by_labels(['System', 'Acquisition'], driver=driver))
+    assert results['System']['query'][0] == "MATCH (n:`System`) RETURN properties(n) AS properties"
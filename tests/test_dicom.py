@@ -0,0 +1,74 @@
+import io
+import pydicom
+from labdataranger.disk.dataset.scan.format import SeriesMetadata, stack_metadata
+from labdataranger.disk.dataset.scan.format.dicom import extract_metadata
+from labdataranger.disk.dataset.scan.modality.mri import process_mri_directory
+from helpers import CountingFileIO, make_mr_series
+
+
+def test_header_only_read_skips_pixels_and_large_values(tmp_path):
+    make_mr_series(tmp_path, 2, rows=128, columns=128, csa_size=100000)
+    files = sorted(str(_p) for _p in tmp_path.glob("*.dcm"))
+
+    metadata = extract_metadata(files[1])
+    assert metadata['InstanceNumber'] == 2
+    assert metadata['Rows'] == 128
+    assert 'PixelData' not in metadata
+    assert '<100000 bytes not read>' in metadata.values()
+
+    CountingFileIO.bytes_read = 0
+    for path in files:
+        with io.BufferedReader(CountingFileIO(path)) as f:
+            extract_metadata(f)
+    assert CountingFileIO.bytes_read < 2 * 100000
+
+
+def test_tag_allowlist(tmp_path):
+    make_mr_series(tmp_path, 1, rows=16, columns=16)
+    path = next(tmp_path.glob("*.dcm"))
+    assert extract_metadata(path, specific_tags=['InstanceNumber', 'Modality']) == {
+        'Modality': 'MR', 'InstanceNumber': 1}
+
+
+def test_series_metadata_round_trip():
+    slices = [
+        {'Modality': 'MR', 'Rows': 4, 'InstanceNumber': 1, 'Comment': 'a'},
+        {'Modality': 'MR', 'Rows': 4, 'InstanceNumber': 2, 'Comment': 'a'},
+        {'Modality': 'MR', 'Rows': 4, 'InstanceNumber': 3},
+    ]
+    series = SeriesMetadata(slices)
+    assert series.shared == {'Modality': 'MR', 'Rows': 4}
+    assert series.varying_tags() == ['InstanceNumber', 'Comment']
+    assert list(series) == slices
+    assert SeriesMetadata.from_dict(series.to_dict())[2] == slices[2]
+
+
+def test_mri_directory_stores_shared_header_once(tmp_path):
+    make_mr_series(tmp_path, 5, rows=16, columns=16)
+    deduplicated = process_mri_directory(str(tmp_path), 'dcm')['dicom_metadata']
+    full = process_mri_directory(str(tmp_path), 'dcm', full_headers=True)['dicom_metadata']
+
+    series = deduplicated[0]['series']
+    assert series['shared']['SeriesDescription'] == 'T2 RARE'
+    assert all(set(_d) == {'SOPInstanceUID', 'InstanceNumber', 'SliceLocation', 'ImagePositionPatient'}
+               for _d in series['slices'])
+    assert stack_metadata(deduplicated[0]) == stack_metadata(full[0]) == full[0]['metadata']
+
+
+def test_sampling_with_allowlist_without_key_tags_reads_every_slice(tmp_path, capsys):
+    make_mr_series(tmp_path, 20, rows=16, columns=16)
+    odd = tmp_path / "slice_00011.dcm"
+    ds = pydicom.dcmread(odd)
+    ds.Rows = 8
+    ds.save_as(odd)
+
+    stack = process_mri_directory(str(tmp_path), 'dcm', dicom_tags=['InstanceNumber'], sample=3)['dicom_metadata'][0]
+    assert 'sampled_indices' not in stack
+    assert len(stack['series']['slices']) == 20
+    out = capsys.readouterr().out
+    assert "leaves out Rows, Columns" in out
+    assert "could not be read from the samples" in out
+
+    stack = process_mri_directory(str(tmp_path), 'dcm', sample=3)['dicom_metadata'][0]
+    assert 'sampled_indices' not in stack
+    assert [_m['Rows'] for _m in stack_metadata(stack)] == [16] * 10 + [8] + [16] * 9
@@ -0,0 +1,48 @@
+import os
+import json
+from labdataranger.graph import driver as registry
+
+
+def test_drivers_are_shared_per_config(tmp_path):
+    config = {'uri': 'bolt://localhost', 'port': 7687, 'username': 'neo4j', 'password': 'secret'}
+    config_file = tmp_path / 'db_config.json'
+    config_file.write_text(json.dumps(config))
+    try:
+        first = registry.get_driver(config_file=config_file)
+        assert registry.get_driver(config=dict(config)) is first
+        assert registry.get_driver(config=dict(config, password='other')) is not first
+        assert registry.get_driver(config=config, max_connection_pool_size=5) is not first
+
+        registry.close_drivers()
+        assert registry.get_driver(config=config) is not first
+    finally:
+        registry.close_drivers()
+
+
+def test_config_uri_appends_port_once():
+    assert registry.config_uri({'uri': 'bolt://localhost', 'port': 7687}) == 'bolt://localhost:7687'
+    assert registry.config_uri({'uri': 'neo4j://db:7688', 'port': 7687}) == 'neo4j://db:7688'
+    assert registry.config_uri({'uri': 'bolt://localhost'}) == 'bolt://localhost'
+
+
+def test_config_file_is_parsed_once_until_it_changes(tmp_path, monkeypatch):
+    config = {'uri': 'bolt://localhost', 'port': 7687, 'username': 'neo4j', 'password': 'a'}
+    config_file = tmp_path / 'db_config.json'
+    config_file.write_text(json.dumps(config))
+    reads = []
+    get_db_config = registry.get_db_config
+    monkeypatch.setattr(registry, 'get_db_config',
+                        lambda config_file: reads.append(config_file) or get_db_config(config_file))
+    try:
+        first = registry.get_driver(config_file=config_file)
+        for _ in range(5):
+            assert registry.get_driver(config_file=config_file) is first
+        assert len(reads) == 1
+
+        config_file.write_text(json.dumps(dict(config, password='b')))
+        stat = config_file.stat()
+        os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        assert registry.get_driver(config_file=config_file) is not first
+        assert len(reads) == 2
+    finally:
+        registry.close_drivers()
@@ -0,0 +1,47 @@
+import csv
+from labdataranger.disk.filetree.survey import FileTree
+from labdataranger.graph.export import CsvGraphExporter, export_forest_csv
+from helpers import make_tree
+
+
+def read_csv(path):
+    with open(path, newline='') as f:
+        return list(csv.reader(f))
+
+
+def test_export_matches_graph(tmp_path):
+    ft = FileTree(make_tree(tmp_path / "data"), skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    out = tmp_path / "import"
+    with CsvGraphExporter(out, max_open_files=2) as exporter:
+        for element in ft.iter_graph():
+            exporter.add(element)
+
+    graph = ft.graph
+    node_rows = sum(_n for _s, _n in exporter.rows.items() if _s.startswith('nodes_'))
+    edge_rows = sum(_n for _s, _n in exporter.rows.items() if _s.startswith('relationships_'))
+    assert node_rows == graph.number_of_nodes()
+    assert edge_rows == graph.number_of_edges()
+
+    folders = exporter.node_files[('Folder', (('name', 'string'),))]
+    assert read_csv(out / f"{folders}.header.csv") == [['filepath:ID(Folder)', 'name', ':LABEL']]
+    assert [str(tmp_path / "data"), 'data', 'Folder'] in read_csv(out / f"{folders}.csv")
+
+    sections = [_s for (_l, _), _s in exporter.node_files.items() if _l == 'System']
+    header = read_csv(out / f"{sections[0]}.header.csv")[0]
+    assert header[0] == 'sectionId:ID(Section)'
+    assert read_csv(out / f"{sections[0]}.csv")[0][-1] == 'System;Section'
+
+    contains = exporter.relationship_files[('CONTAINS_FILE', 'Folder', 'File')]
+    assert read_csv(out / f"{contains}.header.csv") == [[':START_ID(Folder)', ':END_ID(File)', ':TYPE']]
+    assert 'neo4j-admin database import full' in exporter.import_command()
+
+
+def test_export_forest(tmp_path):
+    for name in ('tree_a', 'tree_b'):
+        ft = FileTree(make_tree(tmp_path / "forest" / name), skips=['$RECYCLE.BIN', '.labdataranger'])
+        ft.collect_file_tree()
+        ft.save_state(tmp_path / "forest" / name / '.labdataranger.pkl')
+    exporter = export_forest_csv(tmp_path / "forest", tmp_path / "import")
+    assert exporter.rows[exporter.node_files[('Folder', (('name', 'string'),))]] == 6
+    assert (tmp_path / "import" / "import.sh").exists()
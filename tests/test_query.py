@@ -0,0 +1,196 @@
+import os
+import neo4j
+import pandas as pd
+import pytest
+from labdataranger.graph import query
+from labdataranger.graph import cache as query_cache
+from helpers import FakeDriver, survey_graph
+
+
+class FakeStreamResult:
+    def __init__(self, records, pulled):
+        self.records = records
+        self.pulled = pulled
+
+    def keys(self):
+        return list(self.records[0].keys()) if self.records else ['filepath', 'size']
+
+    def __iter__(self):
+        for record in self.records:
+            self.pulled.append(record)
+            yield record
+
+
+class FakeStreamDriver:
+    """ Hands out records one by one and remembers how many were pulled. """
+    def __init__(self, n):
+        self.records = [neo4j.Record({'filepath': f"/data/f_{_i}", 'size': _i}) for _i in range(n)]
+        self.pulled = []
+        self.session_options = []
+        self.queries = []
+
+    def session(self, **options):
+        self.session_options.append(options)
+        driver = self
+
+        class Session:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                return False
+
+            def run(self, cypher, parameters=None, **kwargs):
+                driver.queries.append((cypher, dict(parameters or {}, **kwargs)))
+                return FakeStreamResult(driver.records, driver.pulled)
+
+        return Session()
+
+
+def test_chunks_are_bounded_and_pulled_lazily():
+    driver = FakeStreamDriver(25)
+    chunks = query.dataframe_chunks("MATCH (n:File) RETURN n.filepath AS filepath, n.size AS size",
+                                    database='instruments', chunk_size=10, fetch_size=5, driver=driver)
+    first = next(chunks)
+    assert list(first.columns) == ['filepath', 'size'] and len(first) == 10
+    assert len(driver.pulled) == 10
+    assert [len(_c) for _c in chunks] == [10, 5]
+    assert driver.session_options == [{'fetch_size': 5, 'database': 'instruments'}]
+
+
+def test_empty_result_yields_one_empty_chunk():
+    chunks = list(query.dataframe_chunks("MATCH (n:Nothing) RETURN n", driver=FakeStreamDriver(0)))
+    assert len(chunks) == 1 and chunks[0].empty
+
+
+def test_export_query_to_csv(tmp_path):
+    rows = query.export_query("MATCH (n:File) RETURN n.filepath AS filepath, n.size AS size",
+                              tmp_path / "files.csv", chunk_size=4, driver=FakeStreamDriver(9),
+                              column_map={'size': 'bytes'})
+    assert rows == 9
+    exported = pd.read_csv(tmp_path / "files.csv")
+    assert list(exported.columns) == ['filepath', 'bytes']
+    assert exported['bytes'].tolist() == list(range(9))
+
+
+def test_export_query_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        query.export_query("RETURN 1", tmp_path / "out.xlsx", driver=FakeStreamDriver(1))
+
+
+class CountingDriver:
+    def __init__(self):
+        self.calls = 0
+
+    def execute_query(self, cypher, parameters_=None, database_=None, result_transformer_=None, **kwargs):
+        self.calls += 1
+        return pd.DataFrame({'n': [self.calls]})
+
+
+def test_cached_dataframe_skips_the_database(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, 'time', lambda: now[0])
+    cache = query_cache.QueryCache(ttl=60, max_entries=2)
+    driver = CountingDriver()
+
+    first = query.dataframe("MATCH (n) RETURN count(n) AS n", driver=driver, cache=cache)
+    again = query.dataframe("MATCH (n) RETURN count(n) AS n", driver=driver, cache=cache,
+                            column_map={'n': 'count'})
+    assert driver.calls == 1 and cache.hits == 1
+    assert list(again.columns) == ['count'] and list(first.columns) == ['n']
+    assert query.dataframe("MATCH (n) RETURN count(n) AS n", driver=driver, cache=cache,
+                           database='other')['n'][0] == 2
+
+    now[0] += 61
+    assert query.dataframe("MATCH (n) RETURN count(n) AS n", driver=driver, cache=cache)['n'][0] == 3
+
+    query.dataframe("RETURN 1 AS n", driver=driver, cache=cache)
+    query.dataframe("RETURN 2 AS n", driver=driver, cache=cache)
+    assert len(cache) == 2
+
+
+def test_cache_persists_to_disk_and_is_invalidated_by_writes(tmp_path):
+    from labdataranger.graph import store
+
+    driver = CountingDriver()
+    cache = query_cache.QueryCache(path=tmp_path / "cache")
+    query.dataframe("RETURN 1 AS n", driver=driver, cache=cache, database='instruments')
+    reopened = query_cache.QueryCache(path=tmp_path / "cache")
+    assert query.dataframe("RETURN 1 AS n", driver=driver, cache=reopened, database='instruments')['n'][0] == 1
+    assert driver.calls == 1
+
+    store.push_to_neo4j(survey_graph(tmp_path / "tree"), driver=FakeDriver(), database='instruments',
+                        provision_schema=False, log_file=tmp_path / 'push.out')
+    assert len(cache) == 0 and len(reopened) == 0
+    assert not list((tmp_path / "cache").glob('*.pkl'))
+    query.dataframe("RETURN 1 AS n", driver=driver, cache=cache, database='instruments')
+    assert driver.calls == 2
+
+
+def test_disk_cache_drops_expired_files_and_keeps_max_entries(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, 'time', lambda: now[0])
+    cache = query_cache.QueryCache(ttl=60, max_entries=2, path=tmp_path)
+    driver = CountingDriver()
+
+    query.dataframe("RETURN 1 AS n", driver=driver, cache=cache)
+    now[0] += 61
+    uri = query._cache_uri(driver)
+    assert query_cache.QueryCache(ttl=60, path=tmp_path).get("RETURN 1 AS n", database='neo4j', uri=uri) is None
+    assert not list(tmp_path.glob('*.pkl'))
+
+    for i, cypher in enumerate(("RETURN 1 AS n", "RETURN 2 AS n", "RETURN 3 AS n")):
+        query.dataframe(cypher, driver=driver, cache=cache)
+        os.utime(cache._file_name(cache.key(cypher, database='neo4j', uri=uri), 'neo4j'), (i, i))
+    assert len(list(tmp_path.glob('*.pkl'))) == 2
+    assert query_cache.QueryCache(path=tmp_path).get("RETURN 1 AS n", database='neo4j', uri=uri) is None
+    assert query_cache.QueryCache(path=tmp_path).get("RETURN 3 AS n", database='neo4j', uri=uri) is not None
+
+
+def test_cache_keys_include_the_server(tmp_path, monkeypatch):
+    from labdataranger.graph import driver as db_driver
+
+    for name in ('lab', 'archive'):
+        (tmp_path / f"{name}.json").write_text(
+            f'{{"uri": "bolt://{name}.example.org", "port": 7687, "username": "u", "password": "p"}}')
+    monkeypatch.setattr(db_driver, '_drivers', {})
+    monkeypatch.setattr(db_driver.neo4j.GraphDatabase, 'driver', lambda uri, **kwargs: CountingDriver())
+    cache = query_cache.QueryCache()
+
+    lab = query.dataframe("RETURN 1 AS n", config_file=tmp_path / "lab.json", cache=cache)
+    archive = query.dataframe("RETURN 1 AS n", config_file=tmp_path / "archive.json", cache=cache)
+    assert len(cache) == 2 and cache.hits == 0
+    assert query.dataframe("RETURN 1 AS n", config_file=tmp_path / "lab.json", cache=cache).equals(lab)
+    assert cache.hits == 1 and lab['n'][0] == archive['n'][0] == 1
+    assert {query._cache_uri(_d) for _d in db_driver._drivers.values()} == {
+        "bolt://lab.example.org:7687", "bolt://archive.example.org:7687"}
+
+
+class RecordingDriver:
+    def __init__(self):
+        self.calls = []
+
+    def execute_query(self, cypher, parameters_=None, database_=None, result_transformer_=None, **kwargs):
+        self.calls.append((cypher, parameters_, database_))
+        return pd.DataFrame({'properties': [{'Scanner': 'SkyScan1276'}]})
+
+
+def test_named_queries_pass_values_as_parameters():
+    driver = RecordingDriver()
+    query.run_query('scan_sections', parameters={'path': '/data/scan_01'}, driver=driver, database='instruments')
+    query.run_query('properties_by_label', labels={'label': 'System`) DETACH DELETE n //'}, driver=driver)
+    assert driver.calls[0] == (query.QUERIES['scan_sections'].cypher, {'path': '/data/scan_01'}, 'instruments')
+    assert driver.calls[1][0] == "MATCH (n:`System``) DETACH DELETE n //`) RETURN properties(n) AS properties"
+
+    with pytest.raises(ValueError):
+        query.run_query('properties_by_label', driver=driver)
+    with pytest.raises(KeyError):
+        query.run_query('no_such_query', driver=driver)
+
+
+def test_cache_keys_include_parameters():
+    driver = RecordingDriver()
+    cache = query_cache.QueryCache()
+    for path in ('/a', '/b', '/a'):
+        query.run_query('files_under_path', parameters={'path': path}, driver=driver, cache=cache)
+    assert len(driver.calls) == 2
@@ -0,0 +1,109 @@
+import threading
+import concurrent.futures
+from pathlib import Path
+import numpy as np
+import tifffile
+from labdataranger.disk.dataset.scan.format import (
+    extract_dicom,
+    extract_tiff,
+    find_file_stacks,
+    process_all_stacks,
+    process_stack,
+    sample_indices,
+)
+from helpers import make_mr_series
+
+
+def test_backends_preserve_slice_order(tmp_path, capsys):
+    make_mr_series(tmp_path, 12, rows=8, columns=8)
+    (tmp_path / "slice_00013.dcm").write_bytes(b"not a dicom file")
+    stacks = find_file_stacks(str(tmp_path), "dcm")
+
+    serial = process_all_stacks(stacks, extract_dicom)
+    assert [_m['InstanceNumber'] for _m in serial[0]['metadata']] == list(range(1, 13))
+    assert "slice_00013.dcm" in capsys.readouterr().out
+
+    for executor in ("thread", "process"):
+        pooled = process_all_stacks(stacks, extract_dicom, executor=executor, max_workers=3, chunk_size=2)
+        assert pooled == serial
+
+    single = process_stack("slice_", stacks["slice_"], extract_dicom, deduplicate=True, executor="thread")
+    assert len(single['series']['slices']) == 12
+
+
+class CountingExecutor(concurrent.futures.ThreadPoolExecutor):
+    """ Thread pool that records the most chunks it ever held unfinished. """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.outstanding = 0
+        self.peak = 0
+
+    def submit(self, *args, **kwargs):
+        with self.lock:
+            self.outstanding += 1
+            self.peak = max(self.peak, self.outstanding)
+        future = super().submit(*args, **kwargs)
+        future.add_done_callback(self.finished)
+        return future
+
+    def finished(self, future):
+        with self.lock:
+            self.outstanding -= 1
+
+
+def test_chunks_in_flight_are_bounded(tmp_path):
+    stacks = {f"stack_{_s}": [str(tmp_path / f"missing_{_s}_{_i}.dcm") for _i in range(50)] for _s in range(3)}
+    with CountingExecutor(max_workers=2) as pool:
+        results = process_all_stacks(stacks, len, executor=pool, max_workers=2, chunk_size=1)
+    assert [_r['metadata'] for _r in results] == [[len(_p) for _p in _f] for _f in stacks.values()]
+    assert pool.peak <= 2 * 2 + 1
+
+
+def test_sampling_reads_representative_slices(tmp_path, capsys):
+    for i in range(20):
+        tifffile.imwrite(tmp_path / f"proj_{i:04d}.tif", np.zeros((4, 6), dtype=np.uint16))
+    stacks = find_file_stacks(str(tmp_path), "tif")
+    assert sample_indices(20, 3) == [0, 5, 10, 14, 19]
+
+    sampled = process_all_stacks(stacks, extract_tiff, sample=3)[0]
+    assert sampled['sampled_indices'] == [0, 5, 10, 14, 19]
+    assert sampled['file_count'] == 20
+    assert len(sampled['metadata']) == 5
+
+    tifffile.imwrite(tmp_path / "proj_0010.tif", np.zeros((4, 6), dtype=np.uint8))
+    stacks = find_file_stacks(str(tmp_path), "tif")
+    for executor in ("serial", "thread"):
+        full = process_all_stacks(stacks, extract_tiff, sample=3, executor=executor, chunk_size=4)[0]
+        assert 'sampled_indices' not in full
+        assert [_m['tiff_tags']['BitsPerSample'] for _m in full['metadata']] == [16] * 10 + [8] + [16] * 9
+    assert "reading all 20 files" in capsys.readouterr().out
+
+
+def test_find_file_stacks_summaries(tmp_path):
+    for name in ("img_1.tif", "img_2.tiff", "img_10.tif", "img_05.tif", "img_5.tif", "img_3.raw", "dark_7.tif"):
+        (tmp_path / name).write_bytes(b"")
+    (tmp_path / "img_4.tif").mkdir()
+
+    stacks = find_file_stacks(str(tmp_path), ["tif", "tiff"])
+    assert isinstance(stacks, dict)
+    assert [Path(_p).name for _p in stacks["img_"]] == ["img_1.tif", "img_2.tiff", "img_05.tif", "img_5.tif", "img_10.tif"]
+    assert stacks.indices["img_"] == [1, 2, 5, 5, 10]
+    assert stacks.summaries["img_"] == {
+        "count": 5, "min_index": 1, "max_index": 10, "missing": [(3, 4), (6, 9)],
+        "missing_count": 6, "duplicates": [5]}
+    assert stacks.summaries["dark_"]["missing"] == []
+    assert list(find_file_stacks(str(tmp_path), "tiff")) == ["img_"]
+
+
+def test_find_file_stacks_large_gap(tmp_path):
+    uid = "1.3.12.2.1107.5.2.30.25245"
+    for number in ("2012032210250863442204963", "2012032210250863442204999", "2012032210250863443304963"):
+        (tmp_path / f"{uid}.{number}.dcm").write_bytes(b"")
+    summary = find_file_stacks(str(tmp_path), "dcm").summaries[f"{uid}."]
+    assert summary["count"] == 3
+    assert summary["missing"] == [
+        (2012032210250863442204964, 2012032210250863442204998),
+        (2012032210250863442205000, 2012032210250863443304962)]
+    assert summary["missing_count"] == 35 + 1099963
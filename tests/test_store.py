@@ -0,0 +1,199 @@
+import time
+import threading
+from collections import Counter
+import neo4j
+import pandas as pd
+from labdataranger.disk.filetree.survey import FileTree
+from labdataranger.graph import store
+from helpers import FakeDriver, FakeSession, make_tree, survey_graph
+
+
+def test_bulk_loader_batches_by_label_and_relationship(tmp_path):
+    graph = survey_graph(tmp_path)
+    driver = FakeDriver()
+    summary = store.push_to_neo4j(graph, driver=driver, batch_size=2, provision_schema=False)
+    assert summary['failed'] == 0
+    assert summary['written'] == graph.number_of_nodes() + graph.number_of_edges()
+    assert driver.transactions == len(driver.queries)
+    assert all(len(_p['rows']) <= 2 for _, _p in driver.queries)
+
+    merged = Counter()
+    for query, parameters in driver.queries:
+        assert query.startswith("UNWIND $rows AS row")
+        merged[query.split('\n')[1] if 'SET' in query else query.split('\n')[3]] += len(parameters['rows'])
+    assert merged["MERGE (n:`Folder` {`filepath`: row.key})"] == 3
+    assert merged["MERGE (n:`File` {`filepath`: row.key})"] == 4
+    assert merged["MERGE (n:`System` {`sectionId`: row.key})"] == 1
+    assert merged["MERGE (a)-[:`CONTAINS_FILE`]->(b)"] == 4
+    assert merged["MERGE (a)-[:`CONTAINS_FOLDER`]->(b)"] == 2
+    assert merged["MERGE (a)-[:`STORED_IN`]->(b)"] == 1
+
+    file_rows = [_r for _q, _p in driver.queries if ':`File`' in _q.split('\n')[1] for _r in _p['rows']]
+    assert all(isinstance(_v, (bool, int, float, str, list)) for _r in file_rows for _v in _r['props'].values())
+
+
+def test_cypher_names_are_escaped():
+    assert store.cypher_name('Folder') == '`Folder`'
+    assert store.cypher_name('a`b') == '`a``b`'
+
+
+def test_push_forest_reports_each_tree(tmp_path):
+    for name in ('tree_a', 'tree_b'):
+        ft = FileTree(make_tree(tmp_path / name), skips=['$RECYCLE.BIN'])
+        ft.collect_file_tree()
+        ft.save_state(tmp_path / name / '.labdataranger.pkl')
+    (tmp_path / 'not_surveyed').mkdir()
+
+    driver = FakeDriver()
+    report = store.push_forest_to_db(tmp_path, driver=driver, load_workers=2, write_workers=2,
+                                     provision_schema=False, log_file=tmp_path / 'push.out').set_index('name')
+    assert sorted(report.index) == ['not_surveyed', 'tree_a', 'tree_b']
+    assert 'FileNotFoundError' in report.loc['not_surveyed', 'error']
+    for name in ('tree_a', 'tree_b'):
+        assert pd.isna(report.loc[name, 'error'])
+        assert report.loc[name, 'failed'] == 0
+        assert report.loc[name, 'written'] == report.loc[name, 'nodes'] + report.loc[name, 'relationships']
+    assert sum(len(_p['rows']) for _, _p in driver.queries) == report['written'].sum()
+
+
+class EdgeFailingDriver(FakeDriver):
+    """ Rejects every relationship batch. """
+    def session(self, database=None):
+        class EdgeFailingSession(FakeSession):
+            def execute_write(self, func, query, rows):
+                if 'MERGE (a)-' in query:
+                    raise neo4j.exceptions.ClientError("rejected")
+                return super().execute_write(func, query, rows)
+        return EdgeFailingSession(self)
+
+
+def test_push_forest_summary_names_each_failure(tmp_path, capsys):
+    ft = FileTree(make_tree(tmp_path / 'tree_a'), skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    ft.save_state(tmp_path / 'tree_a' / '.labdataranger.pkl')
+    (tmp_path / 'not_surveyed').mkdir()
+
+    report = store.push_forest_to_db(tmp_path, driver=EdgeFailingDriver(), provision_schema=False,
+                                     log_file=tmp_path / 'push.out').set_index('name')
+    out = capsys.readouterr().out
+    assert "Pushed 0 of 2 trees" in out
+    assert f"ERROR: tree_a: {report.loc['tree_a', 'relationships']} rows failed" in out
+    assert "ERROR: not_surveyed: FileNotFoundError" in out
+    assert "nan" not in out
+
+
+class SlowSessionDriver(FakeDriver):
+    """ Tags every query with the session that wrote it, slowly enough for writers to overlap. """
+    def __init__(self):
+        super().__init__()
+        self.sessions = 0
+        self.lock = threading.Lock()
+
+    def session(self, database=None):
+        self.sessions += 1
+        session_id = self.sessions
+        driver = self
+
+        class TaggedSession(FakeSession):
+            def execute_write(self, func, *args, **kwargs):
+                time.sleep(0.01)
+                with driver.lock:
+                    start = len(driver.queries)
+                    result = super().execute_write(func, *args, **kwargs)
+                    driver.queries[start] += (session_id,)
+                return result
+        return TaggedSession(self)
+
+
+def test_push_forest_spreads_one_tree_over_all_writers(tmp_path):
+    ft = FileTree(make_tree(tmp_path / 'tree_a'), skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    ft.save_state(tmp_path / 'tree_a' / '.labdataranger.pkl')
+
+    driver = SlowSessionDriver()
+    report = store.push_forest_to_db(tmp_path, driver=driver, batch_size=1, write_workers=3, queue_size=2,
+                                     provision_schema=False, log_file=tmp_path / 'push.out')
+    row = report.set_index('name').loc['tree_a']
+    assert row['failed'] == 0
+    assert row['written'] == row['nodes'] + row['relationships'] == len(driver.queries)
+    assert len({_q[2] for _q in driver.queries}) == 3
+
+    is_edge = ['MERGE (a)-' in _q[0] for _q in driver.queries]
+    assert is_edge == sorted(is_edge)
+
+
+def test_upsert_only_sets_changed_properties_and_prunes_stale_nodes(tmp_path):
+    graph = survey_graph(tmp_path)
+    base = str(tmp_path)
+    stored_file = str(tmp_path / "readme.md")
+    gone_file = str(tmp_path / "deleted.raw")
+    driver = FakeDriver(stored={
+        'File': [stored_file, gone_file],
+        'Folder': [base, str(tmp_path / "project")],
+        'Section': ['System_gone'],
+    })
+    summary = store.push_to_neo4j(graph, driver=driver, prune=True, provision_schema=False)
+    assert summary['deleted'] == 2
+
+    node_queries = [_q for _q, _ in driver.queries if _q.split('\n')[1].startswith('MERGE (n:')]
+    assert node_queries and all("WHERE any(k IN keys(row.props)" in _q for _q in node_queries)
+    assert all("ON CREATE SET n:`Section`" in _q for _q in node_queries if '`sectionId`' in _q)
+    # Properties dropped from a node count as a change and are removed by replacing them
+    assert all("OR any(k IN keys(n) WHERE k <> '" in _q and "NOT k IN keys(row.props))" in _q for _q in node_queries)
+    assert all("SET n = row.props, n.`" in _q for _q in node_queries)
+    assert all("SET n += row.props" not in _q for _q in node_queries)
+
+    reads = [_p for _q, _p in driver.queries if 'RETURN' in _q]
+    assert {_p['base'] for _p in reads} == {base}
+    deletes = {_q.split('\n')[1]: _p['keys'] for _q, _p in driver.queries if 'DETACH DELETE' in _q}
+    assert deletes == {
+        "MATCH (n:File {filepath: key})": [gone_file],
+        "MATCH (n:Section {sectionId: key})": ['System_gone'],
+    }
+    assert [_q for _q, _ in driver.queries if 'DETACH DELETE' in _q][0].startswith("UNWIND $keys AS key\nMATCH (n:Section")
+
+
+def test_base_folder_with_a_scan_log_is_still_a_root(tmp_path):
+    (tmp_path / "base.log").write_text("[System]\nScanner=SkyScan1276\n")
+    graph = survey_graph(tmp_path)
+    base = f"folder_{tmp_path}"
+    assert any(_d['relationship'] == 'stored_in' for _, _, _d in graph.in_edges(base, data=True))
+    assert store.graph_keys(graph)['roots'] == [str(tmp_path)]
+
+
+class IndexAlreadyExists(neo4j.exceptions.ClientError):
+    code = 'Neo.ClientError.Schema.IndexAlreadyExists'
+    message = 'An equivalent index already exists'
+
+
+class ExistingIndexDriver(FakeDriver):
+    """ Fails the Folder constraint the way Neo4j does when neomodel already indexed filepath. """
+    def __init__(self):
+        super().__init__()
+        self.session_runs = []
+
+    def session(self, database=None):
+        driver = self
+
+        class Session(FakeSession):
+            def run(self, query, **parameters):
+                driver.session_runs.append(query)
+                if 'Folder_filepath_unique' in query:
+                    raise IndexAlreadyExists()
+                return super().run(query, **parameters)
+
+        return Session(self)
+
+
+def test_schema_is_provisioned_before_loading(tmp_path):
+    graph = survey_graph(tmp_path)
+    driver = ExistingIndexDriver()
+    store.push_to_neo4j(graph, driver=driver)
+
+    schema = driver.session_runs
+    assert schema[-1] == "CALL db.awaitIndexes($timeout)"
+    assert any('`File_filepath_unique`' in _q and 'REQUIRE n.filepath IS UNIQUE' in _q for _q in schema)
+    assert any('CREATE TEXT INDEX `Folder_filepath_text`' in _q for _q in schema)
+    assert any('FOR (n:`System`) ON (n.sectionId)' in _q for _q in schema)
+    first_write = next(_i for _i, (_q, _) in enumerate(driver.queries) if _q.startswith('UNWIND'))
+    assert all(_q.startswith(('CREATE', 'CALL')) for _q, _ in driver.queries[:first_write])
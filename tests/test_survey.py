@@ -0,0 +1,161 @@
+from labdataranger.disk.filetree.survey import FileTree, process_parallel
+from labdataranger.disk.filetree.columnar import ColumnarTree
+from labdataranger.disk.filetree.index import PathIndex
+from helpers import make_tree
+
+
+def test_collect_file_tree(tmp_path):
+    ft = FileTree(make_tree(tmp_path), skips=['$RECYCLE.BIN'])
+    tree = ft.collect_file_tree()
+    contents = tree['base']['contents']
+    assert '$RECYCLE.BIN' not in contents
+    assert contents['readme.md']['type'] == '.md'
+    assert contents['readme.md']['size'] == 5
+    scan = contents['project']['contents']['scan_01']
+    assert scan['type'] == 'folder'
+    assert scan['contents']['slice_0002.raw']['size'] == 20
+    assert scan['contents']['scan_01.log']['metadata']['System'] == {'Scanner': 'SkyScan1276'}
+
+
+def test_incremental_survey_reuses_unchanged_metadata(tmp_path):
+    make_tree(tmp_path)
+    (tmp_path / "project" / "scan_02").mkdir()
+    (tmp_path / "project" / "scan_02" / "scan_02.log").write_text("[System]\nScanner=A\n")
+    ft = FileTree(tmp_path, skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    assert ft.survey_counts['parsed'] == 2
+
+    (tmp_path / "project" / "scan_03").mkdir()
+    (tmp_path / "project" / "scan_03" / "scan_03.log").write_text("[System]\nScanner=B\n")
+    tree = ft.collect_file_tree(incremental=True)
+    assert ft.survey_counts['parsed'] == 1
+    assert ft.survey_counts['reused'] == 5
+    scans = tree['base']['contents']['project']['contents']
+    assert scans['scan_01']['contents']['scan_01.log']['metadata']['System'] == {'Scanner': 'SkyScan1276'}
+    assert scans['scan_03']['contents']['scan_03.log']['metadata']['System'] == {'Scanner': 'B'}
+
+    tree = ft.collect_file_tree(incremental=True, trust_folder_mtime=True)
+    assert ft.survey_counts['parsed'] == 0
+    assert ft.survey_counts['skipped_folders'] == 5
+    assert 'scan_03.log' in tree['base']['contents']['project']['contents']['scan_03']['contents']
+
+
+def test_process_pool_metadata_matches_inline(tmp_path):
+    make_tree(tmp_path)
+    inline = FileTree(tmp_path, skips=['$RECYCLE.BIN']).collect_file_tree()
+    pooled = FileTree(tmp_path, skips=['$RECYCLE.BIN']).collect_file_tree(
+        metadata_workers=2, metadata_batch_size=1)
+    assert pooled == inline
+
+
+def test_process_parallel_matches_serial_survey(tmp_path):
+    for name in ('tree_a', 'tree_b', 'tree_c'):
+        make_tree(tmp_path / name)
+    report = process_parallel(tmp_path, max_workers=3, max_io_per_mount=2)
+    assert sorted(report['name']) == ['tree_a', 'tree_b', 'tree_c']
+    assert report['error'].isna().all()
+    assert (report['files'] == 4).all()
+
+    for name in ('tree_a', 'tree_b', 'tree_c'):
+        checkpoint = tmp_path / name / '.labdataranger.pkl'
+        surveyed = FileTree(tmp_path / name)
+        surveyed.load_state(checkpoint)
+        expected = FileTree(tmp_path / name, skips=['System Volume Information', '$RECYCLE.BIN'])
+        expected.collect_file_tree()
+        for ft in (surveyed, expected):
+            for skipped in ('.labdataranger.pkl', '.labdataranger.out'):
+                ft.file_tree['base']['contents'].pop(skipped, None)
+        assert surveyed.file_tree['base']['contents'] == expected.file_tree['base']['contents']
+
+
+def test_folder_stats_rollup(tmp_path):
+    make_tree(tmp_path)
+    ft = FileTree(tmp_path, skips=['$RECYCLE.BIN'])
+    tree = ft.collect_file_tree()
+    base = tree['base']
+    project = base['contents']['project']
+    assert 'size' not in project['contents']
+    assert base['file_count'] == 4
+    assert base['size'] == 5 + 10 + 20 + len((tmp_path / "project" / "scan_01" / "scan_01.log").read_bytes())
+    assert project['size'] == base['size'] - 5
+    assert project['newest_mtime_ns'] >= project['contents']['scan_01']['contents']['slice_0001.raw']['mtime_ns']
+
+    folders = ft.list_folders().set_index('name')
+    assert folders.loc['project', 'size'] == project['size']
+    assert folders.loc['project', 'file_count'] == 3
+
+
+def test_columnar_checkpoint_round_trip(tmp_path):
+    make_tree(tmp_path / "data")
+    ft = FileTree(tmp_path / "data", skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    checkpoint = tmp_path / "tree.cols"
+    ft.save_state(checkpoint)
+
+    columnar = ColumnarTree.load(checkpoint)
+    assert len(columnar) == 7
+    assert columnar.to_file_tree() == ft.file_tree
+
+    reloaded = FileTree(tmp_path / "elsewhere")
+    reloaded.load_state(checkpoint)
+    assert reloaded.file_tree == ft.file_tree
+    assert reloaded.base_directory == ft.base_directory
+
+
+def test_checkpoint_loads_lazily(tmp_path):
+    make_tree(tmp_path / "data")
+    ft = FileTree(tmp_path / "data", skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    ft.save_state(tmp_path / "tree.cols")
+    ft.save_state(tmp_path / "tree.pkl")
+
+    opened = FileTree(tmp_path / "data", checkpoint_file=tmp_path / "tree.cols")
+    assert opened._file_tree is None and opened._graph is None
+    assert sorted(opened.list_files('project/scan_01')['name']) == ['scan_01.log', 'slice_0001.raw', 'slice_0002.raw']
+    assert opened._file_tree is None
+
+    opened = FileTree(tmp_path / "data", checkpoint_file=tmp_path / "tree.pkl")
+    assert opened._file_tree is None
+    assert opened.graph.has_node(f"folder_{tmp_path / 'data'}")
+    assert 'base/project' in opened.file_path_index
+
+
+def test_path_index_prefix_lookup():
+    paths = [f"base/project_{p}/scan_{s:03d}" for p in 'ab' for s in range(40)] + ['base/project_a', 'base/project_b']
+    index = PathIndex(paths, block_size=4)
+    assert len(index) == len(paths)
+    assert list(index) == sorted(paths)
+    assert index.prefix('base/project_b/scan_01') == [f"base/project_b/scan_{s:03d}" for s in range(10, 20)]
+    assert index.prefix('base/project_a', limit=3) == ['base/project_a', 'base/project_a/scan_000', 'base/project_a/scan_001']
+    assert index.prefix('base/project_c') == []
+    assert 'base/project_b/scan_039' in index
+    assert 'base/project_b/scan_04' not in index
+
+
+def test_autocomplete_path(tmp_path):
+    make_tree(tmp_path / "data")
+    ft = FileTree(tmp_path / "data", skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    ft.save_state(tmp_path / "tree.cols")
+    for tree in (ft, FileTree(tmp_path / "data", checkpoint_file=tmp_path / "tree.cols")):
+        assert tree.autocomplete_path('base/project/scan_01/sl') == [
+            'base/project/scan_01/slice_0001.raw', 'base/project/scan_01/slice_0002.raw']
+        assert tree.autocomplete_path('base/pro', limit=1) == ['base/project']
+
+
+def test_listing_matches_between_dict_and_columnar_trees(tmp_path):
+    make_tree(tmp_path / "data")
+    ft = FileTree(tmp_path / "data", skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    ft.save_state(tmp_path / "tree.cols")
+    opened = FileTree(tmp_path / "data", checkpoint_file=tmp_path / "tree.cols")
+
+    assert set(ft.folder_index) == {'', 'project', 'project/scan_01'}
+    assert set(opened.folder_index) == set(ft.folder_index)
+    for directory in ('', 'project', 'project/scan_01/'):
+        for listing in ('list_files', 'list_folders', 'list_all'):
+            expected = getattr(ft, listing)(directory).sort_values('name', ignore_index=True)
+            got = getattr(opened, listing)(directory).sort_values('name', ignore_index=True)
+            assert got.astype(str).equals(expected.astype(str))
+    assert opened.get_directory_contents('project') == ft.get_directory_contents('project')
+    assert opened._file_tree is None
@@ -0,0 +1,48 @@
+from labdataranger.disk.filetree.survey import FileTree
+from labdataranger.graph import sync
+from helpers import FakeDriver, make_tree
+
+
+def survey(root):
+    ft = FileTree(root, skips=['$RECYCLE.BIN', '.labdataranger'])
+    ft.collect_file_tree()
+    ft.save_state(root / '.labdataranger.pkl')
+
+
+def rows(driver, marker):
+    return [_r for _q, _p in driver.queries if marker in _q for _r in _p.get('rows', _p.get('keys', []))]
+
+
+def test_sync_pushes_only_the_delta(tmp_path):
+    make_tree(tmp_path)
+    survey(tmp_path)
+    first = FakeDriver()
+    counts = sync.sync_tree_to_db(tmp_path, driver=first, log_file=tmp_path / 'push.out')
+    assert counts['written'] > 0 and counts['removed'] == 0
+    assert sync.manifest_file_name(tmp_path / '.labdataranger.pkl').name == '.labdataranger.sync.json'
+    assert (tmp_path / '.labdataranger.sync.json').exists()
+
+    unchanged = FakeDriver()
+    counts = sync.sync_tree_to_db(tmp_path, driver=unchanged, log_file=tmp_path / 'push.out')
+    assert counts['written'] == 0 and counts['deleted'] == 0
+    assert unchanged.queries == []
+
+    (tmp_path / "project" / "scan_01" / "slice_0003.raw").write_bytes(b"x" * 30)
+    (tmp_path / "readme.md").unlink()
+    survey(tmp_path)
+    delta = FakeDriver()
+    counts = sync.sync_tree_to_db(tmp_path, driver=delta, log_file=tmp_path / 'push.out')
+    assert (counts['added'], counts['removed'], counts['added_edges'], counts['removed_edges']) == (1, 1, 1, 1)
+    assert [_r['key'] for _r in rows(delta, 'MERGE (n:`File`')] == [str(tmp_path / "project" / "scan_01" / "slice_0003.raw")]
+    assert rows(delta, 'MATCH (n:File {filepath: key})') == [str(tmp_path / "readme.md")]
+    assert rows(delta, 'DELETE r') == []
+
+
+def test_manifest_for_another_database_is_ignored(tmp_path):
+    ft = FileTree(make_tree(tmp_path), skips=['$RECYCLE.BIN'])
+    ft.collect_file_tree()
+    manifest, _ = sync.sync_graph(ft.graph, driver=FakeDriver(), database='neo4j')
+    _, counts = sync.sync_graph(ft.graph, manifest, driver=FakeDriver(), database='neo4j')
+    assert counts['written'] == 0
+    _, counts = sync.sync_graph(ft.graph, manifest, driver=FakeDriver(), database='instruments')
+    assert counts['added'] == ft.graph.number_of_nodes()